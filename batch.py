@@ -0,0 +1,185 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import pandas as pd
+
+# Solo módulos sin interfaz: este arranque no importa streamlit ni plotly
+import proveedores
+from graficos import conteo_estados, imagen_estados_base64
+from ingesta import COLUMNAS_NECESARIAS, cargar_pedidos
+from otif import (
+    calcular_metricas_proveedor, calcular_otif_paralelo, calcular_otif_por_lotes, filtrar_por_fechas,
+    ordenar_por_fecha, particionar_por_proveedor
+)
+from reportes import generar_reporte_proveedor_html, metricas_reporte
+
+FORMATOS_METRICAS = ['csv', 'parquet']
+
+def _fecha(texto):
+    """Convierte AAAA-MM-DD de la línea de comandos en fecha"""
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida (se espera AAAA-MM-DD): {texto}")
+
+def _argumentos(argv=None):
+    """Opciones de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Calcula el OTIF de una exportación de pedidos sin interfaz (p. ej. desde cron): "
+                    "escribe las métricas por proveedor y un reporte HTML por proveedor.",
+        epilog="Ejemplo: python batch.py pedidos.xlsx --salida informes/ --desde 2026-01-01 --hasta 2026-01-31"
+    )
+    parser.add_argument('archivo', help="exportación de pedidos (.xlsx, .csv o .parquet)")
+    parser.add_argument('--salida', default='salida_otif', help="directorio de salida (por defecto: %(default)s)")
+    parser.add_argument('--desde', type=_fecha, help="primer día de fecha esperada, AAAA-MM-DD")
+    parser.add_argument('--hasta', type=_fecha, help="último día de fecha esperada, AAAA-MM-DD")
+    parser.add_argument('--formato', choices=FORMATOS_METRICAS + ['ambos'], default='ambos',
+                        help="formato del fichero de métricas (por defecto: %(default)s)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                        help="procesos de trabajo (por defecto: uno por núcleo)")
+    parser.add_argument('--bd', default=proveedores.DB_PATH,
+                        help="base de datos de proveedores (por defecto: %(default)s)")
+    parser.add_argument('--sin-reportes', action='store_true', help="escribir solo las métricas")
+    return parser.parse_args(argv)
+
+def _otif_excel(ruta, procesos):
+    """df_otif de un Excel (con la caché Parquet de la app), repartido entre procesos"""
+    with open(ruta, 'rb') as fichero:
+        df = cargar_pedidos(fichero)
+    faltan = [col for col in COLUMNAS_NECESARIAS if col not in df.columns]
+    if faltan:
+        raise ValueError(f"El archivo no contiene las columnas necesarias: {', '.join(faltan)}")
+    return calcular_otif_paralelo(df, procesos)
+
+def _otif_por_lotes(ruta, desde=None, hasta=None):
+    """df_otif de un CSV o Parquet calculado lote a lote; del resultado solo se lee el periodo"""
+    filtros = []
+    if desde is not None:
+        filtros.append(('Fecha Esperada', '>=', pd.Timestamp(desde)))
+    if hasta is not None:
+        filtros.append(('Fecha Esperada', '<', pd.Timestamp(hasta) + pd.Timedelta(days=1)))
+
+    with tempfile.TemporaryDirectory(prefix='otif_') as directorio:
+        destino = os.path.join(directorio, 'otif.parquet')
+        if calcular_otif_por_lotes(ruta, destino) == 0:
+            return None
+        return pd.read_parquet(destino, filters=filtros or None)
+
+def calcular_otif_archivo(ruta, desde=None, hasta=None, procesos=None):
+    """df_otif del periodo ordenado por fecha (None si el archivo no tiene líneas).
+
+    Los CSV y Parquet se procesan por lotes con calcular_otif_por_lotes, así que una
+    exportación de varios años no se carga entera; los Excel pasan por la caché de la app.
+    """
+    if os.path.splitext(ruta)[1].lower() in ('.xlsx', '.xlsm'):
+        df_otif = _otif_excel(ruta, procesos)
+    else:
+        df_otif = _otif_por_lotes(ruta, desde, hasta)
+    if df_otif is None:
+        return None
+    return filtrar_por_fechas(ordenar_por_fecha(df_otif), desde, hasta)
+
+def nombre_fichero(proveedor):
+    """Nombre de fichero seguro a partir del nombre del proveedor"""
+    return re.sub(r'[^\w.-]+', '_', str(proveedor)).strip('_') or 'proveedor'
+
+def nombres_ficheros(proveedores):
+    """Nombre de fichero único por proveedor: los que coinciden al limpiarlos llevan sufijo _2, _3...
+
+    Sin distinguir mayúsculas, para no pisarse en sistemas de ficheros que no las distinguen.
+    """
+    nombres, usados = {}, set()
+    for proveedor in sorted(proveedores, key=str):
+        base = nombre_fichero(proveedor)
+        nombre, n = base, 1
+        while nombre.casefold() in usados:
+            n += 1
+            nombre = f"{base}_{n}"
+        usados.add(nombre.casefold())
+        nombres[proveedor] = nombre
+    return nombres
+
+def _escribir_reportes(trabajos, directorio):
+    """Trabajo de cada proceso: renderiza y escribe el reporte HTML de varios proveedores"""
+    rutas = []
+    for proveedor, df_proveedor, nombre in trabajos:
+        html = generar_reporte_proveedor_html(
+            proveedor, df_proveedor, metricas_reporte(df_proveedor),
+            imagen_estados_base64(conteo_estados(df_proveedor), proveedor)
+        )
+        ruta = os.path.join(directorio, f"reporte_otif_{nombre}.html")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(html)
+        rutas.append(ruta)
+    return rutas
+
+def generar_reportes(df_otif, directorio, procesos=None):
+    """Escribe un reporte HTML por proveedor, repartiendo los proveedores entre procesos"""
+    os.makedirs(directorio, exist_ok=True)
+    particion = particionar_por_proveedor(df_otif)
+    # Primero los proveedores con más líneas para equilibrar la carga entre procesos
+    orden = sorted(particion, key=lambda proveedor: len(particion[proveedor]), reverse=True)
+    # Los nombres se reparten aquí: cada proceso solo ve sus proveedores y no detectaría choques
+    nombres = nombres_ficheros(orden)
+    procesos = min(procesos or os.cpu_count() or 1, len(orden))
+    if procesos <= 1:
+        return _escribir_reportes(((p, df_otif.take(particion[p]), nombres[p]) for p in orden), directorio)
+
+    # Reparto en turnos: cada proceso recibe solo las líneas de sus proveedores
+    lotes = [[(p, df_otif.take(particion[p]), nombres[p]) for p in orden[i::procesos]] for i in range(procesos)]
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        return [ruta for rutas in pool.map(_escribir_reportes, lotes, [directorio] * procesos) for ruta in rutas]
+
+def escribir_metricas(metricas, directorio, formato='ambos'):
+    """Escribe las métricas por proveedor en CSV y/o Parquet y devuelve las rutas"""
+    os.makedirs(directorio, exist_ok=True)
+    formatos = FORMATOS_METRICAS if formato == 'ambos' else [formato]
+    rutas = []
+    for extension in formatos:
+        ruta = os.path.join(directorio, f"metricas_proveedores.{extension}")
+        if extension == 'csv':
+            metricas.to_csv(ruta, index=False)
+        else:
+            metricas.to_parquet(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
+
+def main(argv=None):
+    args = _argumentos(argv)
+    proveedores.DB_PATH = args.bd
+    inicio = time.perf_counter()
+
+    if not os.path.exists(args.archivo):
+        print(f"❌ No existe el archivo {args.archivo}", file=sys.stderr)
+        return 1
+    try:
+        df_otif = calcular_otif_archivo(args.archivo, args.desde, args.hasta, args.procesos)
+    except ValueError as e:
+        print(f"❌ {args.archivo}: {e}", file=sys.stderr)
+        return 1
+    if df_otif is None or df_otif.empty:
+        print("⚠️ No hay pedidos en el periodo indicado", file=sys.stderr)
+        return 1
+
+    metricas = calcular_metricas_proveedor(df_otif)
+    rutas = escribir_metricas(metricas, args.salida, args.formato)
+    print(f"📊 {len(df_otif):,} líneas, {len(metricas):,} proveedores -> {', '.join(rutas)}")
+
+    if not args.sin_reportes:
+        reportes = generar_reportes(df_otif, args.salida, args.procesos)
+        print(f"📄 {len(reportes):,} reportes HTML en {args.salida}")
+
+    print(f"✅ Terminado en {time.perf_counter() - inicio:.1f} s ({datetime.now():%d/%m/%Y %H:%M})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Raíz del repositorio: los procesos hijos importan los módulos de la app desde aquí
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importaciones medidas, cada una en un intérprete nuevo (sin nada en sys.modules)
+IMPORTACIONES = {
+    'streamlit': 'import streamlit',
+    'pandas': 'import pandas',
+    'numpy': 'import numpy',
+    'plotly.graph_objects': 'import plotly.graph_objects as go; go.Figure, go.Pie',
+    'matplotlib (Agg)': 'from matplotlib.backends.backend_agg import FigureCanvasAgg',
+    'proveedores': 'import proveedores',
+    'otif': 'import otif',
+    'envio': 'import envio',
+}
+
+# Primer render de la página de inicio (sin archivo subido), como al abrir una sesión
+_PORTADA = '''
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=300)
+inicio = time.perf_counter()
+at.run()
+segundos = time.perf_counter() - inicio
+if at.exception:
+    sys.exit(at.exception[0].value)
+print(segundos)
+'''
+
+_IMPORTACION = '''
+import time
+inicio = time.perf_counter()
+{codigo}
+print(time.perf_counter() - inicio)
+'''
+
+def _medir(codigo):
+    """Ejecuta el código en un intérprete nuevo y devuelve los segundos que imprime"""
+    resultado = subprocess.run(
+        [sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=RAIZ, PYTHONDONTWRITEBYTECODE='1')
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1] if resultado.stderr else 'error')
+    return float(resultado.stdout.strip().splitlines()[-1])
+
+def medir_arranque(repeticiones=5):
+    """Mediana y mínimo (s) de cada importación y del primer render de la portada"""
+    casos = {nombre: _IMPORTACION.format(codigo=codigo) for nombre, codigo in IMPORTACIONES.items()}
+    casos['portada app.py (primer render)'] = _PORTADA
+
+    resultados = {}
+    for nombre, codigo in casos.items():
+        try:
+            tiempos = [_medir(codigo) for _ in range(repeticiones)]
+        except RuntimeError as e:
+            print(f"  {nombre}: no se pudo medir ({e})", file=sys.stderr)
+            continue
+        resultados[nombre] = {'mediana': statistics.median(tiempos), 'minimo': min(tiempos)}
+    return resultados
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación y de primer render de la app")
+    parser.add_argument('--repeticiones', type=int, default=5, help="intérpretes por medida (por defecto: %(default)s)")
+    parser.add_argument('--json', help="guardar también los resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    resultados = medir_arranque(args.repeticiones)
+    print(f"{'Medida':<34}{'Mediana (ms)':>14}{'Mínimo (ms)':>14}")
+    for nombre, tiempos in resultados.items():
+        print(f"{nombre:<34}{tiempos['mediana'] * 1000:>14.0f}{tiempos['minimo'] * 1000:>14.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
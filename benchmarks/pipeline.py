@@ -0,0 +1,238 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sinteticos import FECHA_REFERENCIA, RAIZ, TAMANOS, generar_directorio, generar_pedidos
+
+import graficos
+import historico
+import proveedores
+from cubo import calcular_metricas_cubo, construir_cubo_otif, filtrar_cubo
+from ingesta import normalizar_tipos
+from otif import (
+    calcular_metricas_proveedor, calcular_otif, calcular_otif_paralelo, filtrar_por_fechas,
+    lineas_proveedor, ordenar_por_fecha, particionar_por_proveedor, pedidos_pendientes
+)
+from reportes import (
+    generar_reclamacion, generar_reporte_proveedor_html, generar_reporte_proveedor_texto, metricas_reporte
+)
+
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+# Una etapa es más lenta (o consume más memoria) que la referencia si supera este margen
+UMBRAL_REGRESION = 0.25
+# Por debajo de estos valores las diferencias son ruido de medida
+MIN_SEGUNDOS_COMPARAR = 0.01
+MIN_MB_COMPARAR = 1.0
+
+# Proveedores con más líneas para los que se generan reportes en cada medida
+PROVEEDORES_REPORTE = 10
+
+# Imagen fija para medir los reportes sin el coste del gráfico (que tiene su propia etapa)
+_IMAGEN_FIJA = 'iVBORw0KGgo='
+
+def _meses(df_otif, n=12):
+    """Primer y último día de los últimos n meses con datos, como al cambiar de periodo en la app"""
+    ultimo = df_otif['Fecha Esperada'].max()
+    inicios = pd.date_range(end=ultimo, periods=n, freq='MS')
+    return [(inicio.date(), (inicio + pd.offsets.MonthEnd(0)).date()) for inicio in inicios]
+
+def _mayores(datos):
+    """Líneas de los proveedores con más líneas"""
+    particion = datos['particion']
+    mayores = sorted(particion, key=lambda proveedor: len(particion[proveedor]), reverse=True)
+    return [(p, lineas_proveedor(datos['df_otif'], particion, p)) for p in mayores[:PROVEEDORES_REPORTE]]
+
+def _graficos(datos):
+    graficos._imagenes.clear()
+    return [graficos.imagen_estados(graficos.conteo_estados(df), proveedor) for proveedor, df in datos['mayores']]
+
+def _reportes_html(datos):
+    return [
+        generar_reporte_proveedor_html(p, df, metricas_reporte(df), _IMAGEN_FIJA) for p, df in datos['mayores']
+    ]
+
+def _reportes_texto(datos):
+    inicio, fin = datos['meses'][0][0], datos['meses'][-1][1]
+    return [generar_reporte_proveedor_texto(df, metricas_reporte(df), inicio, fin) for _, df in datos['mayores']]
+
+def _reclamaciones(datos):
+    pendientes = datos['pendientes']
+    particion = particionar_por_proveedor(pendientes)
+    return [generar_reclamacion(lineas_proveedor(pendientes, particion, p)) for p in particion]
+
+# (nombre, función, clave donde se guarda el resultado, repetible). Las etapas no
+# repetibles cambian estado (el histórico) y se miden una sola vez.
+ETAPAS = [
+    ('ingesta.normalizar_tipos', lambda d: normalizar_tipos(d['crudo']), 'df', True),
+    ('otif.calcular_otif', lambda d: calcular_otif(d['df']), None, True),
+    ('otif.calcular_otif_paralelo', lambda d: calcular_otif_paralelo(d['df']), 'df_otif', True),
+    ('otif.ordenar_por_fecha', lambda d: ordenar_por_fecha(d['df_otif']), 'df_otif', True),
+    ('otif.filtrar_por_fechas (12 meses)',
+     lambda d: [filtrar_por_fechas(d['df_otif'], inicio, fin) for inicio, fin in d['meses']], None, True),
+    ('cubo.construir_cubo_otif', lambda d: construir_cubo_otif(d['df_otif']), 'cubo', True),
+    ('cubo.métricas por periodo (12 meses)',
+     lambda d: [calcular_metricas_cubo(filtrar_cubo(d['cubo'], inicio, fin)) for inicio, fin in d['meses']],
+     None, True),
+    ('otif.calcular_metricas_proveedor', lambda d: calcular_metricas_proveedor(d['df_otif']), None, True),
+    ('otif.particionar_por_proveedor', lambda d: particionar_por_proveedor(d['df_otif']), 'particion', True),
+    ('graficos.imagen_estados (10 mayores)', _graficos, None, True),
+    ('reportes.reporte HTML (10 mayores)', _reportes_html, None, True),
+    ('reportes.reporte texto (10 mayores)', _reportes_texto, None, True),
+    ('otif.pedidos_pendientes', lambda d: pedidos_pendientes(d['df_otif'], FECHA_REFERENCIA), 'pendientes', True),
+    ('reportes.reclamaciones (todos)', _reclamaciones, None, True),
+    ('historico.registrar_lineas (primera carga)', lambda d: historico.registrar_lineas(d['df_otif']), None, False),
+    ('historico.registrar_lineas (sin cambios)', lambda d: historico.registrar_lineas(d['df_otif']), None, True),
+]
+
+def _medir_tiempo(funcion, datos, repeticiones):
+    """Mejor tiempo de varias ejecuciones y el resultado de la última"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcion(datos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def _medir_memoria(funcion, datos):
+    """Pico de memoria (MB) reservada durante la etapa, medido aparte con tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion(datos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 1024 ** 2
+
+def ejecutar_tamano(n, repeticiones=3, memoria=True, semilla=0):
+    """Ejecuta todas las etapas sobre una exportación sintética de n líneas"""
+    datos = {'crudo': generar_pedidos(n, semilla)}
+
+    # Directorio de proveedores e histórico en una carpeta temporal: no se toca la BD real
+    with tempfile.TemporaryDirectory() as carpeta:
+        proveedores.DB_PATH = os.path.join(carpeta, 'proveedores.db')
+        historico.HISTORICO_DB_PATH = os.path.join(carpeta, 'historico.db')
+        proveedores.cargar_proveedores_desde_excel(generar_directorio(datos['crudo'], semilla))
+
+        resultados = {}
+        for nombre, funcion, clave, repetible in ETAPAS:
+            if memoria and repetible:
+                pico_mb = _medir_memoria(funcion, datos)
+            else:
+                pico_mb = None
+            segundos, resultado = _medir_tiempo(funcion, datos, repeticiones if repetible else 1)
+            resultados[nombre] = {'segundos': segundos, 'pico_mb': pico_mb}
+            if clave:
+                datos[clave] = resultado
+            if clave == 'df_otif':
+                datos['meses'] = _meses(datos['df_otif'])
+            if clave == 'particion':
+                datos['mayores'] = _mayores(datos)
+
+            memoria_txt = f"{pico_mb:9.1f} MB" if pico_mb is not None else ' ' * 12
+            print(f"  {nombre:<46}{segundos * 1000:>10.1f} ms{memoria_txt}", flush=True)
+
+        # Cerrar las conexiones antes de borrar la carpeta temporal
+        for modulo in (proveedores.directorio(), historico.almacen()):
+            if modulo._conn is not None:
+                modulo._conn.close()
+                modulo._conn = None
+
+    return resultados
+
+def _version():
+    """Commit actual del repositorio (con '+' si hay cambios sin confirmar) o 'local'"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('+' if cambios else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'local'
+
+def comparar(actual, referencia, umbral=UMBRAL_REGRESION):
+    """Etapas que empeoran respecto a la referencia: lista de (tamaño, etapa, medida, antes, después)"""
+    regresiones = []
+    for tamano, etapas in actual['resultados'].items():
+        for etapa, medidas in etapas.items():
+            anterior = referencia.get('resultados', {}).get(tamano, {}).get(etapa)
+            if not anterior:
+                continue
+            for medida, minimo in (('segundos', MIN_SEGUNDOS_COMPARAR), ('pico_mb', MIN_MB_COMPARAR)):
+                antes, despues = anterior.get(medida), medidas.get(medida)
+                if antes is None or despues is None or max(antes, despues) < minimo:
+                    continue
+                if despues > antes * (1 + umbral):
+                    regresiones.append((tamano, etapa, medida, antes, despues))
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mide cada etapa del cálculo OTIF (tiempo y pico de memoria) sobre exportaciones "
+                    "sintéticas y guarda los resultados para comparar versiones.",
+        epilog="Ejemplo: python benchmarks/pipeline.py --tamanos 10k 100k --comparar benchmarks/resultados/base.json"
+    )
+    parser.add_argument('--tamanos', nargs='+', choices=list(TAMANOS), default=list(TAMANOS),
+                        help="tamaños a medir (por defecto: todos)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="ejecuciones por etapa; se guarda la mejor")
+    parser.add_argument('--sin-memoria', action='store_true', help="no medir picos de memoria (más rápido)")
+    parser.add_argument('--salida', help="fichero JSON de resultados (por defecto: benchmarks/resultados/<versión>.json)")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help="empeoramiento relativo que cuenta como regresión (por defecto: %(default)s)")
+    args = parser.parse_args(argv)
+
+    version = _version()
+    resultado = {
+        'version': version,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'cpus': os.cpu_count(),
+            'plataforma': platform.platform()
+        },
+        'repeticiones': args.repeticiones,
+        'resultados': {}
+    }
+    for tamano in args.tamanos:
+        print(f"{tamano} líneas", flush=True)
+        resultado['resultados'][tamano] = ejecutar_tamano(TAMANOS[tamano], args.repeticiones, not args.sin_memoria)
+
+    salida = args.salida or os.path.join(DIRECTORIO_RESULTADOS, f"{version}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados -> {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            referencia = json.load(f)
+        regresiones = comparar(resultado, referencia, args.umbral)
+        print(f"Comparación con {referencia.get('version', args.comparar)}:")
+        for tamano, etapa, medida, antes, despues in regresiones:
+            unidad = 's' if medida == 'segundos' else 'MB'
+            print(f"  ⚠️ REGRESIÓN {tamano} {etapa}: {medida} {antes:.3f} {unidad} -> {despues:.3f} {unidad} "
+                  f"({(despues / antes - 1) * 100:+.0f}%)")
+        if regresiones:
+            return 1
+        print("  ✅ Sin regresiones")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ingesta import COLUMNAS_NECESARIAS
+
+# Día de referencia de los datos: los resultados no dependen de cuándo se ejecuta
+FECHA_REFERENCIA = date(2026, 1, 15)
+
+# Tamaños estándar de la suite (líneas de pedido)
+TAMANOS = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+# Reparto de retrasos (días entre fecha real y esperada) de las líneas entregadas
+_RETRASOS = np.array([-10, -3, -1, 0, 1, 2, 3, 5, 10, 30])
+_PROB_RETRASOS = np.array([0.03, 0.05, 0.07, 0.45, 0.12, 0.08, 0.06, 0.06, 0.05, 0.03])
+
+def _zipf(rng, n, categorias, exponente):
+    """Índices en [0, categorias) con sesgo tipo Zipf: pocos valores concentran la mayoría"""
+    pesos = np.arange(1, categorias + 1, dtype='float64') ** -exponente
+    return rng.choice(categorias, size=n, p=pesos / pesos.sum())
+
+def num_proveedores(n):
+    """Proveedores distintos para un tamaño dado (crece con el volumen, como en el ERP)"""
+    return int(min(2000, max(50, n // 500)))
+
+def generar_pedidos(n, semilla=0, proveedores=None, almacenes=12):
+    """Exportación sintética del ERP con exactamente las columnas necesarias.
+
+    Los proveedores y almacenes siguen una distribución sesgada (unos pocos concentran la
+    mayoría de líneas), los pedidos tienen varias líneas y hay entregas a tiempo, tarde,
+    adelantadas, parciales y pendientes, con fechas de dos años alrededor de FECHA_REFERENCIA.
+    """
+    rng = np.random.default_rng(semilla)
+    proveedores = proveedores or num_proveedores(n)
+
+    # Documentos de 1 a ~20 líneas; cada documento es de un proveedor y un almacén
+    lineas_documento = np.minimum(rng.geometric(0.25, size=n), 20)
+    lineas_documento = lineas_documento[np.cumsum(lineas_documento) <= n]
+    lineas_documento = np.append(lineas_documento, n - lineas_documento.sum())
+    lineas_documento = lineas_documento[lineas_documento > 0]
+    num_documentos = len(lineas_documento)
+    documento = np.repeat(np.arange(num_documentos), lineas_documento)
+
+    proveedor_doc = 100_000 + _zipf(rng, num_documentos, proveedores, 1.1)
+    almacen_doc = _zipf(rng, num_documentos, almacenes, 1.3)
+    referencia = np.datetime64(FECHA_REFERENCIA, 'D')
+    esperada_doc = referencia + rng.integers(-640, 90, size=num_documentos).astype('timedelta64[D]')
+
+    esperada = esperada_doc[documento]
+    cantidad = rng.integers(1, 200, size=n).astype('float64')
+
+    # Entregadas con su retraso; el resto pendiente total o parcialmente
+    retraso = rng.choice(_RETRASOS, size=n, p=_PROB_RETRASOS).astype('timedelta64[D]')
+    real = (esperada + retraso).astype('datetime64[ns]')
+    pendiente = np.zeros(n)
+    no_entregada = (rng.random(n) < 0.12) | (esperada > referencia)
+    real[no_entregada] = np.datetime64('NaT')
+    pendiente[no_entregada] = cantidad[no_entregada]
+    parcial = ~no_entregada & (rng.random(n) < 0.04)
+    pendiente[parcial] = np.floor(cantidad[parcial] / 2)
+    # Algunas líneas completas sin fecha real, como las que el ERP cierra a mano
+    sin_fecha = ~no_entregada & (rng.random(n) < 0.01)
+    real[sin_fecha] = np.datetime64('NaT')
+
+    articulo = 10_000 + _zipf(rng, n, 50_000, 0.8)
+    df = pd.DataFrame({
+        'Nº documento': pd.Series(documento).map('PC-{:08d}'.format),
+        'Compra a-Nº proveedor': proveedor_doc[documento],
+        'Nº': articulo.astype(str),
+        'Descripción': pd.Series(articulo).map('Artículo sintético {:05d}'.format),
+        'Cód. almacén': np.array([f'ALM{i:02d}' for i in range(almacenes)])[almacen_doc[documento]],
+        'Fecha recepción esperada': esperada.astype('datetime64[ns]'),
+        'Fecha recepción real': real,
+        'Fecha pedido': (esperada - rng.integers(15, 120, size=n).astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'Cantidad (base)': cantidad,
+        'Cdad. pendiente (base)': pendiente,
+        'Coste unit. directo excl. IVA': np.round(rng.gamma(2.0, 15.0, size=n), 2)
+    })
+    return df[COLUMNAS_NECESARIAS]
+
+def generar_directorio(df_pedidos, semilla=0):
+    """Excel de proveedores para los códigos de los pedidos (algunos sin alias, sin email o sin alta)"""
+    rng = np.random.default_rng(semilla + 1)
+    codigos = np.sort(df_pedidos['Compra a-Nº proveedor'].unique())
+    # Un 3% de proveedores no está dado de alta en el directorio
+    codigos = codigos[rng.random(len(codigos)) >= 0.03]
+    n = len(codigos)
+    return pd.DataFrame({
+        'Nº': codigos,
+        'Nombre': [f'PROVEEDOR SINTÉTICO {codigo} S.L.' for codigo in codigos],
+        'Alias': np.where(rng.random(n) < 0.5, [f'PROV {codigo}' for codigo in codigos], None),
+        'Correo electrónico': np.where(rng.random(n) < 0.9, [f'compras{codigo}@ejemplo.com' for codigo in codigos], None)
+    })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera exportaciones sintéticas de pedidos para pruebas de rendimiento")
+    parser.add_argument('tamano', choices=list(TAMANOS), help="número de líneas")
+    parser.add_argument('destino', help="fichero de salida (.parquet, .csv o .xlsx)")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generar_pedidos(TAMANOS[args.tamano], args.semilla)
+    extension = os.path.splitext(args.destino)[1].lower()
+    if extension == '.csv':
+        df.to_csv(args.destino, index=False)
+    elif extension == '.xlsx':
+        df.to_excel(args.destino, index=False)
+    else:
+        df.to_parquet(args.destino, index=False)
+    print(f"{len(df):,} líneas -> {args.destino}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Presupuesto de memoria de la caché compartida entre sesiones, en MB
+VARIABLE_PRESUPUESTO = 'OTIF_CACHE_MB'
+PRESUPUESTO_MB = 1024
+
+# Carpeta de la capa en disco para los DataFrames (vacía: solo memoria)
+VARIABLE_DISCO = 'OTIF_CACHE_DISCO'
+
+def tamano_bytes(valor):
+    """Memoria aproximada de un resultado (DataFrames, arrays y contenedores de ellos)"""
+    if hasattr(valor, 'memory_usage') and hasattr(valor, 'columns'):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if hasattr(valor, 'memory_usage'):
+        return int(valor.memory_usage(index=True, deep=True))
+    if hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_bytes(k) + tamano_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+class CacheResultados:
+    """Caché LRU por proceso de resultados ya calculados, con presupuesto de memoria.
+
+    La comparten todas las sesiones: si varios usuarios suben el mismo archivo, el primero
+    calcula y los demás esperan su resultado en lugar de repetirlo. Los DataFrames pueden
+    guardarse además en disco (Parquet) para sobrevivir a un reinicio. Los valores se
+    devuelven sin copiar: no se deben modificar.
+    """
+
+    def __init__(self, presupuesto_bytes, directorio=None):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.directorio = directorio
+        self.lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._calculando = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _buscar(self, clave):
+        with self.lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada
+
+    def _guardar(self, clave, valor):
+        tamano = tamano_bytes(valor)
+        with self.lock:
+            if tamano > self.presupuesto_bytes:
+                return
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[clave] = (valor, tamano)
+            self._bytes += tamano
+            # Se descartan las entradas usadas hace más tiempo hasta volver al presupuesto
+            while self._bytes > self.presupuesto_bytes:
+                _, (_, tamano_descartado) = self._entradas.popitem(last=False)
+                self._bytes -= tamano_descartado
+
+    def _ruta(self, clave):
+        """Fichero Parquet de una clave en la capa en disco"""
+        huella = hashlib.sha256(repr(clave).encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, f"{clave[0]}-{huella}.parquet")
+
+    def _leer_disco(self, clave):
+        import pandas as pd
+
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            return pd.read_parquet(ruta)
+        except Exception as e:
+            print(f"Nota: caché de resultados inválida en disco, se recalcula: {e}")
+            return None
+
+    def _escribir_disco(self, clave, df):
+        """Escribe el Parquet de forma atómica (nunca deja ficheros a medias)"""
+        ruta = self._ruta(clave)
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            df.to_parquet(ruta_tmp, index=False)
+            os.replace(ruta_tmp, ruta)
+        except (OSError, ImportError, ValueError) as e:
+            print(f"Nota: no se pudo guardar la caché de resultados: {e}")
+
+    def obtener(self, clave, calcular, disco=False):
+        """Resultado de `clave` (tupla cuyo primer elemento nombra la etapa); si falta, lo calcula.
+
+        Con disco=True (solo DataFrames con índice por defecto) se busca y guarda también en la
+        capa en disco, si está configurada.
+        """
+        entrada = self._buscar(clave)
+        if entrada is not None:
+            return entrada[0]
+
+        # Un cálculo por clave: las sesiones que piden lo mismo a la vez esperan al primero
+        with self.lock:
+            cerrojo = self._calculando.setdefault(clave, [threading.Lock(), 0])
+            cerrojo[1] += 1
+        try:
+            with cerrojo[0]:
+                entrada = self._buscar(clave)
+                if entrada is not None:
+                    return entrada[0]
+
+                usar_disco = disco and self.directorio is not None
+                valor = self._leer_disco(clave) if usar_disco else None
+                if valor is None:
+                    with self.lock:
+                        self.fallos += 1
+                    valor = calcular()
+                    if usar_disco:
+                        self._escribir_disco(clave, valor)
+                self._guardar(clave, valor)
+                return valor
+        finally:
+            with self.lock:
+                cerrojo[1] -= 1
+                if cerrojo[1] == 0:
+                    del self._calculando[clave]
+
+    def estadisticas(self):
+        """Entradas, MB ocupados, presupuesto, aciertos y fallos de la caché"""
+        with self.lock:
+            return {
+                'entradas': len(self._entradas),
+                'mb': self._bytes / 1024 ** 2,
+                'presupuesto_mb': self.presupuesto_bytes / 1024 ** 2,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos
+            }
+
+    def vaciar(self):
+        """Descarta todos los resultados en memoria (la capa en disco se conserva)"""
+        with self.lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+_cache = None
+_lock_cache = threading.Lock()
+
+def cache():
+    """Caché de resultados del proceso, configurada con OTIF_CACHE_MB y OTIF_CACHE_DISCO"""
+    global _cache
+    if _cache is None:
+        with _lock_cache:
+            if _cache is None:
+                presupuesto_mb = float(os.environ.get(VARIABLE_PRESUPUESTO) or PRESUPUESTO_MB)
+                _cache = CacheResultados(int(presupuesto_mb * 1024 ** 2), os.environ.get(VARIABLE_DISCO) or None)
+    return _cache
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from otif import ESTADOS_OTIF, cantidad_entregada, filtrar_por_fechas
+
+# Dimensiones del cubo y medidas que se suman en cada celda
+DIMENSIONES_CUBO = ['Proveedor', 'Almacén', 'Día', 'Estado']
+MEDIDAS_CUBO = ['Líneas', 'Líneas OTIF', 'Cantidad Total', 'Cantidad Pendiente',
+                'Cantidad Entregada', 'Días Diferencia']
+
+def construir_cubo_otif(df_otif):
+    """Pre-agrega las líneas por (proveedor, almacén, día esperado, estado), ordenado por día"""
+    dia = df_otif['Fecha Esperada'].dt.normalize().rename('Día')
+    # Las medidas se suman en float64/int64 aunque df_otif las guarde en tipos compactos
+    medidas = pd.DataFrame({
+        'Cantidad Total': df_otif['Cantidad Total'].astype('float64'),
+        'Cantidad Pendiente': df_otif['Cantidad Pendiente'].astype('float64'),
+        'Cantidad Entregada': cantidad_entregada(df_otif).astype('float64'),
+        'Días Diferencia': df_otif['Días Diferencia'].astype('int64')
+    })
+
+    cubo = medidas.groupby(
+        [df_otif['Proveedor'], df_otif['Almacén'], dia, df_otif['Estado']],
+        dropna=False, observed=True, sort=False
+    ).agg(**{
+        'Líneas': ('Cantidad Total', 'size'),
+        'Cantidad Total': ('Cantidad Total', 'sum'),
+        'Cantidad Pendiente': ('Cantidad Pendiente', 'sum'),
+        'Cantidad Entregada': ('Cantidad Entregada', 'sum'),
+        'Días Diferencia': ('Días Diferencia', 'sum'),
+    }).reset_index()
+
+    # Las líneas OTIF se guardan como medida para que todo se resuelva sumando
+    cubo['Líneas OTIF'] = cubo['Líneas'].where(cubo['Estado'].isin(ESTADOS_OTIF), 0)
+
+    cubo = cubo.sort_values('Día', kind='stable', na_position='last').reset_index(drop=True)
+    return cubo[DIMENSIONES_CUBO + MEDIDAS_CUBO]
+
+def filtrar_cubo(cubo, fecha_inicio=None, fecha_fin=None, proveedores=None, almacenes=None):
+    """Celdas del cubo para un periodo (búsqueda binaria por día) y, opcionalmente, proveedores/almacenes"""
+    cubo = filtrar_por_fechas(cubo, fecha_inicio, fecha_fin, columna='Día')
+    if proveedores is not None:
+        cubo = cubo[cubo['Proveedor'].isin(proveedores)]
+    if almacenes is not None:
+        cubo = cubo[cubo['Almacén'].isin(almacenes)]
+    return cubo
+
+def resumen_cubo(cubo):
+    """Totales de una selección del cubo: (total líneas, líneas OTIF, % OTIF, nº proveedores)"""
+    total = int(cubo['Líneas'].sum())
+    otif = int(cubo['Líneas OTIF'].sum())
+    otif_pct = (otif / total * 100) if total > 0 else 0
+    return total, otif, otif_pct, cubo['Proveedor'].nunique()
+
+def calcular_metricas_cubo(cubo):
+    """Equivalente a calcular_metricas_proveedor sumando celdas del cubo"""
+    metricas = cubo.groupby('Proveedor', observed=True)[
+        ['Líneas OTIF', 'Líneas', 'Cantidad Total', 'Cantidad Entregada', 'Días Diferencia']
+    ].sum().reset_index()
+
+    metricas.columns = ['Proveedor', 'OTIF Count', 'Total Pedidos',
+                        'Cantidad Total', 'Cantidad Entregada', 'Días Diferencia Promedio']
+    metricas['Días Diferencia Promedio'] = metricas['Días Diferencia Promedio'] / metricas['Total Pedidos']
+
+    metricas['% OTIF'] = (metricas['OTIF Count'] / metricas['Total Pedidos'] * 100).round(2)
+    metricas['% Fill Rate'] = (metricas['Cantidad Entregada'] / metricas['Cantidad Total'] * 100).round(2)
+
+    return metricas
+
+def conteo_estados_cubo(cubo, proveedores):
+    """Conteo de líneas por estado de varios proveedores (proveedor -> tupla de (estado, líneas), de mayor a menor)"""
+    celdas = cubo[cubo['Proveedor'].isin(proveedores)]
+    lineas = celdas.groupby(['Proveedor', 'Estado'], observed=True)['Líneas'].sum()
+    lineas = lineas[lineas > 0].sort_values(ascending=False, kind='stable')
+
+    conteos = {proveedor: [] for proveedor in proveedores}
+    for (proveedor, estado), total in lineas.items():
+        conteos[proveedor].append((estado, int(total)))
+    return {proveedor: tuple(conteo) for proveedor, conteo in conteos.items()}
@@ -0,0 +1,205 @@
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from email.message import EmailMessage
+
+from graficos import conteo_estados, imagen_estados_base64, precalcular_imagenes
+from instrumentacion import span
+from otif import lineas_proveedor
+from proveedores import obtener_email_proveedor
+from reportes import generar_reporte_proveedor_html, generar_reporte_proveedor_texto, metricas_reporte
+
+# Conexiones SMTP abiertas a la vez (y envíos simultáneos)
+MAX_CONEXIONES = 4
+
+# Reintentos por mensaje ante errores temporales y espera inicial entre ellos (se duplica)
+REINTENTOS = 3
+ESPERA_REINTENTO = 2.0
+
+# Segundos de espera de la conexión con el servidor
+TIMEOUT_SMTP = 30
+
+class PoolSMTP:
+    """Conexiones SMTP persistentes reutilizadas entre envíos.
+
+    Como máximo se abren `tamano` conexiones; cada envío toma una libre y la devuelve al
+    terminar. STARTTLS y login solo se usan si el servidor los ofrece (y hay credenciales),
+    de modo que también funciona contra un servidor local de depuración:
+        python -m aiosmtpd -n -l localhost:1025
+    """
+
+    def __init__(self, servidor, puerto, usuario=None, password=None, tls=None, tamano=MAX_CONEXIONES):
+        self.servidor = servidor
+        self.puerto = int(puerto)
+        self.usuario = usuario
+        self.password = password
+        # None: STARTTLS si el servidor lo anuncia; True: obligatorio; False: nunca
+        self.tls = tls
+        self.tamano = tamano
+        self._libres = queue.LifoQueue()
+        self._huecos = threading.BoundedSemaphore(tamano)
+
+    def _abrir(self):
+        """Abre y autentica una conexión nueva"""
+        if self.puerto == 465:
+            smtp = smtplib.SMTP_SSL(self.servidor, self.puerto, timeout=TIMEOUT_SMTP,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=TIMEOUT_SMTP)
+            smtp.ehlo()
+            if self.tls or (self.tls is None and smtp.has_extn('starttls')):
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+
+        if self.usuario and self.password and smtp.has_extn('auth'):
+            smtp.login(self.usuario, self.password)
+        return smtp
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool; si el envío falla se descarta en vez de devolverla"""
+        self._huecos.acquire()
+        try:
+            try:
+                smtp = self._libres.get_nowait()
+            except queue.Empty:
+                smtp = self._abrir()
+
+            try:
+                yield smtp
+            except BaseException:
+                _cerrar(smtp)
+                raise
+            self._libres.put(smtp)
+        finally:
+            self._huecos.release()
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres"""
+        while True:
+            try:
+                _cerrar(self._libres.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def _cerrar(smtp):
+    """Cierra una conexión sin propagar errores de un servidor que ya cortó"""
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+def _es_temporal(error):
+    """Errores que merece la pena reintentar: cortes de red y respuestas 4xx"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # SMTPException hereda de OSError: el resto de errores SMTP son permanentes
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+def enviar_mensaje(pool, mensaje, reintentos=REINTENTOS, espera=ESPERA_REINTENTO):
+    """Envía un mensaje por el pool reintentando los errores temporales"""
+    for intento in range(reintentos + 1):
+        try:
+            with pool.conexion() as smtp:
+                smtp.send_message(mensaje)
+            return
+        except Exception as e:
+            if intento == reintentos or not _es_temporal(e):
+                raise
+            time.sleep(espera * 2 ** intento)
+
+def crear_mensaje(remitente, destinatario, asunto, texto, html=None, adjuntos=()):
+    """Email con cuerpo de texto, alternativa HTML opcional y adjuntos (nombre, contenido, tipo)"""
+    mensaje = EmailMessage()
+    mensaje['From'] = remitente
+    # En la BD hay emails con varias direcciones separadas por ';'
+    mensaje['To'] = ', '.join(d.strip() for d in destinatario.replace(';', ',').split(',') if d.strip())
+    mensaje['Subject'] = asunto
+    mensaje.set_content(texto)
+    if html is not None:
+        mensaje.add_alternative(html, subtype='html')
+    for nombre, contenido, tipo in adjuntos:
+        maintype, subtype = tipo.split('/')
+        mensaje.add_attachment(contenido, maintype=maintype, subtype=subtype, filename=nombre)
+    return mensaje
+
+def asunto_reporte(proveedor):
+    """Asunto por defecto del email del reporte OTIF"""
+    return f"Reporte OTIF - {proveedor} - {datetime.now().strftime('%B %Y')}"
+
+def mensaje_reporte_proveedor(df_proveedor, proveedor, remitente, destinatario, fecha_inicio, fecha_fin,
+                              imagen_base64=None):
+    """Email del reporte OTIF de un proveedor: resumen en texto y el reporte HTML adjunto"""
+    if imagen_base64 is None:
+        imagen_base64 = imagen_estados_base64(conteo_estados(df_proveedor), proveedor)
+    metricas = metricas_reporte(df_proveedor)
+    html = generar_reporte_proveedor_html(proveedor, df_proveedor, metricas, imagen_base64)
+    texto = generar_reporte_proveedor_texto(df_proveedor, metricas, fecha_inicio, fecha_fin)
+    nombre_adjunto = f"reporte_otif_{proveedor}_{datetime.now().strftime('%Y%m%d')}.html"
+
+    return crear_mensaje(
+        remitente, destinatario, asunto_reporte(proveedor), texto,
+        adjuntos=[(nombre_adjunto, html.encode('utf-8'), 'text/html')]
+    )
+
+def enviar_reportes_proveedores(df_otif, particion, pool, remitente, fecha_inicio, fecha_fin,
+                                proveedores=None, reintentos=REINTENTOS, al_progresar=None):
+    """Genera y envía el reporte OTIF de cada proveedor por el pool de conexiones.
+
+    Los reportes se renderizan dentro de los hilos de envío, así que como mucho hay
+    `pool.tamano` reportes en memoria a la vez. Los proveedores sin email se omiten.
+    Devuelve una lista de (proveedor, email, error) con error None si se envió bien;
+    `al_progresar(hechos, total)` se llama tras cada proveedor.
+    """
+    if proveedores is None:
+        proveedores = sorted(particion)
+
+    def enviar(proveedor, email):
+        df_proveedor = lineas_proveedor(df_otif, particion, proveedor)
+        mensaje = mensaje_reporte_proveedor(df_proveedor, proveedor, remitente, email, fecha_inicio, fecha_fin)
+        enviar_mensaje(pool, mensaje, reintentos=reintentos)
+
+    resultados = []
+    trabajos = []
+    for proveedor in proveedores:
+        codigo = df_otif['Código Proveedor'].iloc[particion[proveedor][0]]
+        email = obtener_email_proveedor(codigo)
+        if email:
+            trabajos.append((proveedor, email))
+        else:
+            resultados.append((proveedor, '', 'Sin email registrado'))
+
+    # Los gráficos que faltan se dibujan antes, en paralelo y una vez por combinación de conteos y título
+    with span('envio.imagenes', proveedores=len(trabajos)):
+        precalcular_imagenes(
+            (conteo_estados(lineas_proveedor(df_otif, particion, proveedor)), proveedor) for proveedor, _ in trabajos
+        )
+
+    total = len(proveedores)
+    with span('envio.emails', proveedores=len(trabajos)), ThreadPoolExecutor(max_workers=pool.tamano) as ejecutor:
+        futuros = {ejecutor.submit(enviar, proveedor, email): (proveedor, email) for proveedor, email in trabajos}
+        for futuro in as_completed(futuros):
+            proveedor, email = futuros[futuro]
+            error = futuro.exception()
+            resultados.append((proveedor, email, str(error) if error else None))
+            if al_progresar:
+                al_progresar(len(resultados), total)
+
+    return resultados
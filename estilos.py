@@ -0,0 +1,167 @@
+import re
+from functools import lru_cache
+
+# CSS personalizado para diseño moderno (se envía minificado en cada rerun)
+_CSS_APP = """
+    /* Fondo general */
+    .stApp {
+        background-color: white;
+    }
+    
+    /* Asegurar que todo el texto sea oscuro y visible */
+    .stApp * {
+        color: #3D3D3D;
+    }
+    
+    /* Header personalizado */
+    .main-header {
+        background: linear-gradient(135deg, #D4C5B9 0%, #B8A898 100%);
+        padding: 2rem;
+        border-radius: 10px;
+        margin-bottom: 2rem;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    
+    .main-title {
+        color: white !important;
+        font-size: 2.5rem;
+        font-weight: 700;
+        margin: 0;
+        text-align: center;
+    }
+    
+    .subtitle {
+        color: white !important;
+        font-size: 1.2rem;
+        text-align: center;
+        margin-top: 0.5rem;
+    }
+    
+    /* Métricas personalizadas */
+    .metric-card {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 10px;
+        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
+        border-left: 4px solid #5B7C8D;
+        margin-bottom: 1rem;
+    }
+    
+    .metric-value {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #3D3D3D !important;
+        margin: 0;
+    }
+    
+    .metric-label {
+        font-size: 0.9rem;
+        color: #8B7355 !important;
+        text-transform: uppercase;
+        letter-spacing: 1px;
+        margin-top: 0.5rem;
+    }
+    
+    /* Botones */
+    .stButton>button {
+        background-color: #5B7C8D;
+        color: white;
+        border-radius: 8px;
+        padding: 0.5rem 2rem;
+        border: none;
+        font-weight: 600;
+        transition: all 0.3s;
+    }
+    
+    .stButton>button:hover {
+        background-color: #4A6A7A;
+        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
+    }
+    
+    /* Sidebar */
+    [data-testid="stSidebar"] {
+        background-color: white;
+        border-right: 3px solid #D4C5B9;
+    }
+    
+    [data-testid="stSidebar"] .stMarkdown h3 {
+        color: #5B7C8D;
+        font-weight: 700;
+        font-size: 1.1rem;
+    }
+    
+    [data-testid="stSidebar"] .stMarkdown p,
+    [data-testid="stSidebar"] .stMarkdown li {
+        color: #3D3D3D;
+        font-size: 0.95rem;
+    }
+    
+    [data-testid="stSidebar"] label {
+        color: #3D3D3D !important;
+        font-weight: 500;
+    }
+    
+    [data-testid="stSidebar"] .stSelectbox label,
+    [data-testid="stSidebar"] .stDateInput label {
+        color: #3D3D3D !important;
+    }
+    
+    /* Tabs personalizados */
+    .stTabs [data-baseweb="tab-list"] {
+        gap: 8px;
+    }
+    
+    .stTabs [data-baseweb="tab"] {
+        background-color: white;
+        border-radius: 8px 8px 0 0;
+        padding: 12px 24px;
+        color: #3D3D3D !important;
+        font-weight: 600;
+    }
+    
+    .stTabs [aria-selected="true"] {
+        background-color: #5B7C8D;
+        color: white !important;
+    }
+    
+    /* Asegurar texto visible en todo Streamlit */
+    .stMarkdown, .stMarkdown p, .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
+        color: #3D3D3D !important;
+    }
+    
+    /* Info boxes */
+    .stAlert {
+        color: #3D3D3D !important;
+    }
+    
+    /* Footer */
+    .footer {
+        text-align: right;
+        padding: 1rem;
+        color: #8B7355;
+        font-size: 0.9rem;
+        margin-top: 2rem;
+    }
+    
+    /* Filtros */
+    .filter-section {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 10px;
+        margin-bottom: 1.5rem;
+        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
+    }
+"""
+
+def minificar_css(css):
+    """Quita comentarios y espacios sobrantes del CSS (no cambia ninguna regla)"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+@lru_cache(maxsize=None)
+def estilos_app():
+    """Bloque <style> de la app, minificado una sola vez por proceso"""
+    return f"<style>{minificar_css(_CSS_APP)}</style>"
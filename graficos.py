@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import io
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from otif import ESTADOS_OTIF
+
+# Colores KAVE HOME por estado
+COLORES_ESTADO = {
+    'OTIF': '#5B7C8D',
+    'ADELANTADO': '#8B9AA5',
+    'EXCEPCIÓN (2 DÍAS TARDE)': '#D4C5B9',
+    'ENTREGADO TARDE': '#8B7355',
+    'NO ENTREGADO': '#3D3D3D',
+    'ENTREGADO ANTES': '#8B9AA5',
+    'SIN FECHA REAL (COMPLETO)': '#B8A898'
+}
+COLOR_POR_DEFECTO = '#CCCCCC'
+
+# Tamaño en píxeles de la imagen del gráfico en los reportes
+ANCHO_IMAGEN = 800
+ALTO_IMAGEN = 600
+DPI_IMAGEN = 100
+
+# Por debajo de este porcentaje no se rotula el sector (no cabe el texto)
+MIN_PCT_ETIQUETA = 5
+
+# Por debajo de este número de imágenes no compensa arrancar procesos (cada uno importa matplotlib)
+MIN_IMAGENES_PARALELO = 64
+
+# Imágenes PNG ya renderizadas, por huella de conteos y título (LRU: se descartan las usadas hace más tiempo)
+MAX_IMAGENES = 2048
+_imagenes = OrderedDict()
+_lock_imagenes = threading.Lock()
+# matplotlib no es seguro entre hilos: se renderiza de uno en uno dentro del proceso
+_lock_render = threading.Lock()
+
+def conteo_estados(df_proveedor):
+    """Conteo de líneas por estado, de mayor a menor, como tupla de (estado, líneas)"""
+    conteos = df_proveedor['Estado'].value_counts()
+    # Estado es categórica: value_counts incluye los estados sin líneas
+    conteos = conteos[conteos > 0]
+    return tuple(zip(conteos.index.tolist(), conteos.tolist()))
+
+def huella_imagen(conteos, titulo=None):
+    """Huella de un gráfico: dos gráficos con los mismos conteos y el mismo título son idénticos"""
+    return hashlib.sha256(repr((tuple(conteos), titulo)).encode('utf-8')).hexdigest()
+
+def _renderizar_png(conteos, titulo=None, ancho=ANCHO_IMAGEN, alto=ALTO_IMAGEN):
+    """Dibuja el donut de estados con matplotlib (sin pyplot ni navegador) y devuelve el PNG.
+
+    El título (normalmente el nombre del proveedor) va encima del % OTIF.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    estados = [estado for estado, _ in conteos]
+    valores = [lineas for _, lineas in conteos]
+    total = sum(valores)
+    otif = sum(lineas for estado, lineas in conteos if estado in ESTADOS_OTIF)
+    otif_pct = (otif / total * 100) if total > 0 else 0
+
+    figura = Figure(figsize=(ancho / DPI_IMAGEN, alto / DPI_IMAGEN), dpi=DPI_IMAGEN)
+    FigureCanvasAgg(figura)
+    ejes = figura.add_axes([0.02, 0.05, 0.6, 0.8])
+
+    sectores, _, _ = ejes.pie(
+        valores,
+        colors=[COLORES_ESTADO.get(estado, COLOR_POR_DEFECTO) for estado in estados],
+        startangle=90,
+        counterclock=False,
+        wedgeprops=dict(width=0.6, edgecolor='white', linewidth=2),
+        autopct=lambda pct: f'{pct:.1f}%' if pct >= MIN_PCT_ETIQUETA else '',
+        pctdistance=0.7,
+        textprops=dict(color='white', fontsize=12, fontweight='bold')
+    )
+    ejes.set_aspect('equal')
+
+    figura.legend(
+        sectores,
+        [f'{estado} ({lineas})' for estado, lineas in conteos],
+        loc='center left',
+        bbox_to_anchor=(0.62, 0.45),
+        frameon=False,
+        fontsize=10,
+        labelcolor='#3D3D3D'
+    )
+    if titulo:
+        figura.suptitle(titulo, fontsize=16, fontweight='bold', color='#3D3D3D', y=0.97)
+        figura.text(0.5, 0.89, f'OTIF {otif_pct:.1f}%', ha='center', fontsize=13, color='#3D3D3D')
+    else:
+        figura.suptitle(f'OTIF {otif_pct:.1f}%', fontsize=18, fontweight='bold', color='#3D3D3D', y=0.95)
+
+    buffer = io.BytesIO()
+    figura.savefig(buffer, format='png', transparent=True)
+    return buffer.getvalue()
+
+def _buscar_imagen(huella):
+    """Imagen en caché (None si no está); un acierto la marca como usada recientemente"""
+    with _lock_imagenes:
+        imagen = _imagenes.get(huella)
+        if imagen is not None:
+            _imagenes.move_to_end(huella)
+        return imagen
+
+def imagen_estados(conteos, titulo=None):
+    """PNG del donut para unos conteos de estado y un título; cada combinación se renderiza una sola vez"""
+    conteos = tuple(conteos)
+    huella = huella_imagen(conteos, titulo)
+
+    imagen = _buscar_imagen(huella)
+    if imagen is None:
+        with _lock_render:
+            imagen = _buscar_imagen(huella)
+            if imagen is None:
+                imagen = _renderizar_png(conteos, titulo)
+                _guardar_imagenes({huella: imagen})
+    return imagen
+
+def _guardar_imagenes(nuevas):
+    """Añade imágenes a la caché respetando el máximo de entradas"""
+    with _lock_imagenes:
+        _imagenes.update(nuevas)
+        while len(_imagenes) > MAX_IMAGENES:
+            _imagenes.popitem(last=False)
+
+def imagen_estados_base64(conteos, titulo=None):
+    """PNG del donut en base64, listo para incrustar en el HTML de los reportes"""
+    return base64.b64encode(imagen_estados(conteos, titulo)).decode()
+
+def precalcular_imagenes(graficos, procesos=None):
+    """Renderiza en paralelo (un proceso por núcleo) las imágenes que aún no están en caché.
+
+    `graficos` son pares (conteos, título), como los argumentos de imagen_estados.
+    """
+    pendientes = {}
+    with _lock_imagenes:
+        for conteos, titulo in graficos:
+            conteos = tuple(conteos)
+            huella = huella_imagen(conteos, titulo)
+            if huella not in _imagenes:
+                pendientes[huella] = (conteos, titulo)
+
+    if not pendientes:
+        return
+    procesos = procesos or multiprocessing.cpu_count()
+    if procesos <= 1 or len(pendientes) < MIN_IMAGENES_PARALELO:
+        for conteos, titulo in pendientes.values():
+            imagen_estados(conteos, titulo)
+        return
+
+    try:
+        contexto = multiprocessing.get_context('forkserver')
+    except ValueError:
+        contexto = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=min(procesos, len(pendientes)), mp_context=contexto) as pool:
+        conteos, titulos = zip(*pendientes.values())
+        imagenes = list(pool.map(_renderizar_png, conteos, titulos, chunksize=8))
+    _guardar_imagenes(dict(zip(pendientes.keys(), imagenes)))
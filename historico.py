@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from otif import ESTADOS_OTIF
+
+# Base de datos del histórico OTIF (aparte de proveedores.db para no inflarla)
+HISTORICO_DB_PATH = "historico.db"
+
+# Columnas de df_otif -> columnas de la tabla de hechos; las dos primeras son la clave
+COLUMNAS_HISTORICO = {
+    'Nº documento': 'documento',
+    'Nº Artículo': 'articulo',
+    'Código Proveedor': 'codigo_proveedor',
+    'Proveedor': 'proveedor',
+    'Almacén': 'almacen',
+    'Fecha Esperada': 'fecha_esperada',
+    'Fecha Real': 'fecha_real',
+    'Cantidad Total': 'cantidad_total',
+    'Cantidad Pendiente': 'cantidad_pendiente',
+    'Días Diferencia': 'dias_diferencia',
+    'Estado': 'estado'
+}
+CLAVE_HISTORICO = ['documento', 'articulo']
+CAMPOS_HISTORICO = list(COLUMNAS_HISTORICO.values()) + ['es_otif', 'huella']
+
+class AlmacenHistorico:
+    """Conexión única por proceso a la base de datos del histórico"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+
+    def conexion(self):
+        """Conexión compartida (WAL); se reabre si el proceso es un fork del original"""
+        with self.lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                # historico.db no está en el repositorio (se crea al primer uso): WAL no ensucia nada
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                _init_historico(self._conn)
+                self._pid = os.getpid()
+            return self._conn
+
+_almacen = None
+
+def almacen():
+    """Almacén del histórico del proceso (se crea al primer uso)"""
+    global _almacen
+    if _almacen is None or _almacen.db_path != HISTORICO_DB_PATH:
+        _almacen = AlmacenHistorico(HISTORICO_DB_PATH)
+    return _almacen
+
+def _init_historico(conn):
+    """Crea la tabla de hechos: una fila por línea de pedido con su estado OTIF"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lineas_otif (
+            documento TEXT NOT NULL,
+            articulo TEXT NOT NULL,
+            codigo_proveedor INTEGER,
+            proveedor TEXT,
+            almacen TEXT,
+            fecha_esperada TEXT,
+            fecha_real TEXT,
+            cantidad_total REAL,
+            cantidad_pendiente REAL,
+            dias_diferencia INTEGER,
+            estado TEXT,
+            es_otif INTEGER,
+            huella INTEGER,
+            fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (documento, articulo)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_lineas_otif_fecha ON lineas_otif (fecha_esperada)')
+    conn.commit()
+
+def _hechos(df_otif):
+    """Filas de la tabla de hechos a partir de df_otif, con una huella por fila para detectar cambios"""
+    hechos = df_otif[list(COLUMNAS_HISTORICO)].rename(columns=COLUMNAS_HISTORICO)
+    hechos = hechos[hechos['documento'].notna() & hechos['articulo'].notna()]
+
+    # Si una línea se repite en la exportación gana la última, como en la propia tabla
+    hechos = hechos.drop_duplicates(CLAVE_HISTORICO, keep='last')
+
+    # Fechas como texto ISO (comparables en SQL) y tipos nativos para sqlite3
+    for campo in ['fecha_esperada', 'fecha_real']:
+        hechos[campo] = hechos[campo].dt.strftime('%Y-%m-%d').astype(object).where(hechos[campo].notna(), None)
+    hechos['codigo_proveedor'] = hechos['codigo_proveedor'].astype(object).where(hechos['codigo_proveedor'].notna(), None)
+    # df_otif guarda cantidades y días en tipos compactos: se amplían para que la huella no dependa de ellos
+    for campo in ['cantidad_total', 'cantidad_pendiente']:
+        hechos[campo] = hechos[campo].astype('float64')
+    hechos['dias_diferencia'] = hechos['dias_diferencia'].astype('int64')
+    for campo in ['documento', 'articulo', 'proveedor', 'almacen', 'estado']:
+        hechos[campo] = hechos[campo].astype(object).where(hechos[campo].notna(), None)
+    hechos['es_otif'] = hechos['estado'].isin(ESTADOS_OTIF).astype('int64')
+
+    # La huella (entero con signo de 64 bits, como los de SQLite) resume todos los campos
+    hechos['huella'] = pd.util.hash_pandas_object(hechos, index=False).astype('int64')
+    return hechos.reset_index(drop=True)
+
+def registrar_lineas(df_otif):
+    """Vuelca las líneas de df_otif al histórico, escribiendo solo las nuevas o cambiadas.
+
+    La clave es (Nº documento, Nº Artículo): una exportación diaria que repite casi todo
+    el histórico solo escribe lo que ha cambiado. La carga se compara en SQLite desde una
+    tabla temporal, buscando por clave primaria, así que el coste depende del tamaño de la
+    exportación y no del histórico. Devuelve un resumen de la carga.
+    """
+    hechos = _hechos(df_otif)
+
+    columnas = ', '.join(CAMPOS_HISTORICO)
+    placeholders = ', '.join(['?'] * len(CAMPOS_HISTORICO))
+    actualizar = ', '.join(f'{campo} = excluded.{campo}' for campo in CAMPOS_HISTORICO[2:])
+
+    alm = almacen()
+    with alm.lock:
+        conn = alm.conexion()
+        with conn:
+            conn.execute(f'CREATE TEMP TABLE IF NOT EXISTS carga_otif ({columnas}, PRIMARY KEY (documento, articulo))')
+            conn.execute('DELETE FROM carga_otif')
+            conn.executemany(
+                f'INSERT INTO carga_otif ({columnas}) VALUES ({placeholders})',
+                hechos[CAMPOS_HISTORICO].itertuples(index=False, name=None)
+            )
+
+            nuevas, cambiadas = conn.execute('''
+                SELECT COALESCE(SUM(l.documento IS NULL), 0),
+                       COALESCE(SUM(l.documento IS NOT NULL AND l.huella IS NOT c.huella), 0)
+                FROM carga_otif c
+                LEFT JOIN lineas_otif l ON l.documento = c.documento AND l.articulo = c.articulo
+            ''').fetchone()
+
+            # "WHERE true" evita que SQLite lea el ON CONFLICT como parte del SELECT
+            conn.execute(f'''
+                INSERT INTO lineas_otif ({columnas}) SELECT {columnas} FROM carga_otif WHERE true
+                ON CONFLICT(documento, articulo) DO UPDATE SET {actualizar}, fecha_actualizacion = CURRENT_TIMESTAMP
+                WHERE lineas_otif.huella IS NOT excluded.huella
+            ''')
+            conn.execute('DELETE FROM carga_otif')
+
+    return {
+        'nuevas': nuevas,
+        'actualizadas': cambiadas,
+        'sin_cambios': len(hechos) - nuevas - cambiadas
+    }
+
+def resumen_historico(fecha_inicio, fecha_fin):
+    """(total, otif, % OTIF) de las líneas del histórico con fecha esperada en el periodo"""
+    alm = almacen()
+    with alm.lock:
+        total, otif = alm.conexion().execute('''
+            SELECT COUNT(*), COALESCE(SUM(es_otif), 0) FROM lineas_otif
+            WHERE fecha_esperada BETWEEN ? AND ?
+        ''', (fecha_inicio.isoformat(), fecha_fin.isoformat())).fetchone()
+
+    otif_pct = (otif / total * 100) if total > 0 else 0
+    return total, otif, otif_pct
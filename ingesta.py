@@ -0,0 +1,169 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+# Directorio donde se guardan las versiones columnares de los Excel ya procesados
+CACHE_DIR = os.path.join(".cache", "ingesta")
+
+# Cambiar la versión invalida todos los ficheros cacheados (p.ej. si cambian los tipos)
+VERSION_INGESTA = 1
+
+# Tamaño de bloque para calcular la huella sin cargar el archivo entero en memoria
+TAM_BLOQUE_HUELLA = 1024 * 1024
+
+# Filas por lote en la lectura por lotes de exportaciones grandes
+TAM_LOTE = 100_000
+
+COLUMNAS_NECESARIAS = [
+    'Nº documento', 'Compra a-Nº proveedor', 'Nº', 'Descripción',
+    'Cód. almacén', 'Fecha recepción esperada', 'Fecha recepción real',
+    'Fecha pedido', 'Cantidad (base)', 'Cdad. pendiente (base)',
+    'Coste unit. directo excl. IVA'
+]
+
+# Tipos explícitos de cada columna necesaria
+COLUMNA_PROVEEDOR = 'Compra a-Nº proveedor'
+COLUMNAS_TEXTO = ['Nº documento', 'Nº', 'Descripción', 'Cód. almacén']
+COLUMNAS_FECHA = ['Fecha recepción esperada', 'Fecha recepción real', 'Fecha pedido']
+COLUMNAS_NUMERICAS = ['Cantidad (base)', 'Cdad. pendiente (base)', 'Coste unit. directo excl. IVA']
+
+def _a_texto(serie):
+    """Convierte una columna a texto sin dejar '.0' en los códigos numéricos"""
+    if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+        serie = serie.astype('Int64')
+    return serie.astype('string')
+
+def normalizar_tipos(df):
+    """Se queda con las columnas necesarias y les aplica tipos explícitos"""
+    df = df[[col for col in COLUMNAS_NECESARIAS if col in df.columns]].copy()
+
+    for col in COLUMNAS_TEXTO:
+        if col in df.columns:
+            df[col] = _a_texto(df[col])
+
+    for col in COLUMNAS_FECHA:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+
+    for col in COLUMNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col]).astype('float64')
+
+    if COLUMNA_PROVEEDOR in df.columns:
+        df[COLUMNA_PROVEEDOR] = pd.to_numeric(df[COLUMNA_PROVEEDOR]).astype('Int64')
+
+    return df
+
+def huella_archivo(fichero, tam_bloque=TAM_BLOQUE_HUELLA):
+    """Huella SHA-256 del contenido de un fichero, leída por bloques"""
+    digest = hashlib.sha256()
+    fichero.seek(0)
+    for bloque in iter(lambda: fichero.read(tam_bloque), b''):
+        digest.update(bloque)
+    fichero.seek(0)
+    return digest.hexdigest()
+
+def leer_excel_pedidos(fichero):
+    """Parsea el Excel de pedidos leyendo solo las columnas necesarias"""
+    if isinstance(fichero, bytes):
+        fichero = io.BytesIO(fichero)
+    df = pd.read_excel(fichero, usecols=lambda col: col in COLUMNAS_NECESARIAS)
+    return normalizar_tipos(df)
+
+def ruta_cache(huella):
+    """Ruta del fichero Parquet para un contenido de Excel dado"""
+    return os.path.join(CACHE_DIR, f"{huella}-v{VERSION_INGESTA}.parquet")
+
+def _guardar_parquet(df, ruta):
+    """Escribe el Parquet de forma atómica (nunca deja ficheros a medias)"""
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+        df.to_parquet(ruta_tmp, index=False)
+        os.replace(ruta_tmp, ruta)
+    except (OSError, ImportError) as e:
+        print(f"Nota: no se pudo guardar la caché de ingesta: {e}")
+
+def cargar_pedidos(fichero, huella=None):
+    """Devuelve los pedidos del Excel, reutilizando la copia Parquet si ya se parseó antes"""
+    if isinstance(fichero, bytes):
+        fichero = io.BytesIO(fichero)
+    if huella is None:
+        huella = huella_archivo(fichero)
+    ruta = ruta_cache(huella)
+
+    if os.path.exists(ruta):
+        try:
+            return pd.read_parquet(ruta)
+        except Exception as e:
+            # Fichero corrupto o de otra versión de pyarrow: se vuelve a generar
+            print(f"Nota: caché de ingesta inválida, se regenera: {e}")
+
+    fichero.seek(0)
+    df = leer_excel_pedidos(fichero)
+
+    # Solo se cachean archivos válidos; los incompletos se rechazan en la app
+    if all(col in df.columns for col in COLUMNAS_NECESARIAS):
+        _guardar_parquet(df, ruta)
+
+    return df
+
+def _lotes_parquet(ruta, tam_lote):
+    """Itera un Parquet por lotes de filas leyendo solo las columnas necesarias"""
+    import pyarrow.parquet as pq
+
+    archivo = pq.ParquetFile(ruta)
+    columnas = [col for col in COLUMNAS_NECESARIAS if col in archivo.schema_arrow.names]
+    for batch in archivo.iter_batches(batch_size=tam_lote, columns=columnas):
+        yield batch.to_pandas()
+
+def _lotes_excel(ruta, tam_lote):
+    """Itera un Excel en modo solo lectura de openpyxl (streaming, sin cargar la hoja)"""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        cabecera = next(filas, None)
+        if cabecera is None:
+            return
+
+        indices = [i for i, col in enumerate(cabecera) if col in COLUMNAS_NECESARIAS]
+        columnas = [cabecera[i] for i in indices]
+
+        lote = []
+        for fila in filas:
+            valores = [fila[i] if i < len(fila) else None for i in indices]
+            # Saltar filas vacías al final de la hoja
+            if all(valor is None for valor in valores):
+                continue
+            lote.append(valores)
+            if len(lote) == tam_lote:
+                yield pd.DataFrame(lote, columns=columnas)
+                lote = []
+
+        if lote:
+            yield pd.DataFrame(lote, columns=columnas)
+    finally:
+        libro.close()
+
+def leer_lotes_pedidos(ruta, tam_lote=TAM_LOTE):
+    """Lee los pedidos de un CSV, Parquet o Excel en lotes de filas ya normalizados"""
+    extension = os.path.splitext(ruta)[1].lower()
+
+    if extension == '.csv':
+        lotes = pd.read_csv(ruta, usecols=lambda col: col in COLUMNAS_NECESARIAS, chunksize=tam_lote)
+    elif extension == '.parquet':
+        lotes = _lotes_parquet(ruta, tam_lote)
+    elif extension in ('.xlsx', '.xlsm'):
+        lotes = _lotes_excel(ruta, tam_lote)
+    else:
+        raise ValueError(f"Formato no soportado para lectura por lotes: {extension}")
+
+    for lote in lotes:
+        faltantes = [col for col in COLUMNAS_NECESARIAS if col not in lote.columns]
+        if faltantes:
+            raise ValueError(f"El archivo no contiene las columnas necesarias: {', '.join(faltantes)}")
+        yield normalizar_tipos(lote)
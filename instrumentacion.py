@@ -0,0 +1,117 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Fichero JSON Lines donde se registran las trazas de todas las sesiones (vacío: no se registran)
+VARIABLE_LOG_TRAZAS = 'OTIF_LOG_TRAZAS'
+
+_MB = 1024 ** 2
+_lock_log = threading.Lock()
+
+def memoria_rss_mb():
+    """Memoria residente del proceso en MB (lectura barata de /proc; pico del proceso si no hay /proc)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / _MB
+    except (OSError, ValueError, AttributeError):
+        import resource
+        import sys
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux lo da en KB y macOS en bytes
+        return pico / _MB if sys.platform == 'darwin' else pico / 1024
+
+class Traza:
+    """Tiempos y memoria de las etapas (spans anidados) de una ejecución del script.
+
+    Cada span guarda su duración y la variación de memoria residente del proceso. Con
+    memoria_python=True también el pico de memoria reservada por Python (tracemalloc),
+    que es más preciso pero ralentiza la ejecución y es global al proceso.
+    """
+
+    def __init__(self, memoria_python=False):
+        self.spans = []
+        self._pila = []
+        self._inicio = time.perf_counter()
+        self._tracemalloc_propio = memoria_python and not tracemalloc.is_tracing()
+        if self._tracemalloc_propio:
+            tracemalloc.start()
+        self.memoria_python = memoria_python
+        self.terminada = False
+
+    @contextmanager
+    def span(self, nombre, **atributos):
+        """Mide el bloque como una etapa; los spans abiertos dentro quedan como hijos"""
+        padre = self._pila[-1] if self._pila else None
+        registro = {'span': nombre, 'nivel': len(self._pila), 'padre': padre['span'] if padre else None}
+        registro.update(atributos)
+        self.spans.append(registro)
+
+        medir_python = self.memoria_python and tracemalloc.is_tracing()
+        if medir_python:
+            # El pico se reinicia por span: el del padre se conserva aparte para no perderlo
+            actual, pico = tracemalloc.get_traced_memory()
+            if padre is not None:
+                padre['_pico'] = max(padre.get('_pico', 0), pico)
+            tracemalloc.reset_peak()
+            registro['_base'] = actual
+        rss_inicio = memoria_rss_mb()
+        self._pila.append(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['ms'] = (time.perf_counter() - inicio) * 1000
+            self._pila.pop()
+            registro['rss_mb'] = memoria_rss_mb()
+            registro['delta_rss_mb'] = registro['rss_mb'] - rss_inicio
+            if medir_python:
+                pico = max(tracemalloc.get_traced_memory()[1], registro.pop('_pico', 0))
+                registro['pico_python_mb'] = (pico - registro.pop('_base')) / _MB
+                if padre is not None:
+                    padre['_pico'] = max(padre.get('_pico', 0), pico)
+
+    def total_ms(self):
+        """Milisegundos desde que empezó la ejecución"""
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def terminar(self):
+        """Detiene tracemalloc si lo arrancó esta traza"""
+        if self._tracemalloc_propio and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._tracemalloc_propio = False
+        self.terminada = True
+
+    def registrar(self, ruta=None, **contexto):
+        """Añade los spans como líneas JSON (una por span) para agregarlas entre sesiones"""
+        ruta = ruta or os.environ.get(VARIABLE_LOG_TRAZAS)
+        if not ruta:
+            return
+        fecha = datetime.now().isoformat(timespec='milliseconds')
+        total_ms = self.total_ms()
+        lineas = [
+            json.dumps({'fecha': fecha, **contexto, **span, 'total_ejecucion_ms': total_ms},
+                       ensure_ascii=False, default=str)
+            for span in self.spans
+        ]
+        try:
+            with _lock_log, open(ruta, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lineas) + '\n')
+        except OSError as e:
+            print(f"Nota: no se pudo escribir el log de trazas: {e}")
+
+# Traza de la ejecución en curso: los módulos sin interfaz abren spans sin recibirla
+_traza_activa = contextvars.ContextVar('traza_activa', default=None)
+
+def activar(traza):
+    """Hace de `traza` la traza en curso del hilo (la ejecución del script)"""
+    _traza_activa.set(traza)
+
+def span(nombre, **atributos):
+    """Span en la traza en curso; si no hay ninguna activa no mide nada"""
+    traza = _traza_activa.get()
+    return traza.span(nombre, **atributos) if traza is not None else nullcontext()
@@ -0,0 +1,387 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ingesta import COLUMNAS_FECHA, TAM_LOTE, leer_lotes_pedidos
+from proveedores import obtener_nombres_proveedores
+
+# Cambiar la versión invalida los resultados cacheados (si cambian las reglas o las columnas de df_otif)
+VERSION_REGLAS = 1
+
+# Estados posibles de una línea; el índice es el código de estado
+ESTADOS = [
+    'SIN FECHA REAL (COMPLETO)',
+    'NO ENTREGADO',
+    'OTIF',
+    'EXCEPCIÓN (2 DÍAS TARDE)',
+    'ENTREGADO TARDE',
+    'ENTREGADO ANTES'
+]
+ESTADOS_OTIF = ['OTIF', 'EXCEPCIÓN (2 DÍAS TARDE)']
+CODIGO_NO_ENTREGADO = ESTADOS.index('NO ENTREGADO')
+
+# Proveedor de las líneas sin código de proveedor en la exportación
+PROVEEDOR_DESCONOCIDO = 'Proveedor desconocido'
+
+# Columnas de texto de df_otif con pocos valores distintos: se guardan como categóricas
+COLUMNAS_CATEGORICAS = ['Nº Artículo', 'Descripción', 'Almacén']
+
+# Por debajo de este número de líneas no compensa arrancar procesos
+MIN_FILAS_PARALELO = 200_000
+
+def _clasificar(fecha_esperada, fecha_real, cantidad_pendiente):
+    """Reglas del diagrama de flujo sobre arrays numpy: devuelve (días diferencia, códigos de estado)"""
+    # Calcular días diferencia (0 si falta alguna fecha)
+    sin_fecha = np.isnat(fecha_real) | np.isnat(fecha_esperada)
+    dias_diferencia = np.zeros(len(fecha_real), dtype=np.int64)
+    dias_diferencia[~sin_fecha] = (fecha_real[~sin_fecha] - fecha_esperada[~sin_fecha]) // np.timedelta64(1, 'D')
+
+    # Determinar si está completo
+    entregado_completo = cantidad_pendiente == 0
+    tiene_fecha_real = ~np.isnat(fecha_real)
+
+    # Calcular estado usando condiciones vectorizadas
+    condiciones = [
+        ~tiene_fecha_real & entregado_completo,  # SIN FECHA REAL (COMPLETO)
+        ~tiene_fecha_real & ~entregado_completo,  # NO ENTREGADO
+        tiene_fecha_real & ~entregado_completo,  # NO ENTREGADO
+        tiene_fecha_real & entregado_completo & (dias_diferencia == 0),  # OTIF
+        tiene_fecha_real & entregado_completo & (dias_diferencia > 0) & (dias_diferencia <= 2),  # EXCEPCIÓN
+        tiene_fecha_real & entregado_completo & (dias_diferencia > 2),  # ENTREGADO TARDE
+        tiene_fecha_real & entregado_completo & (dias_diferencia < 0),  # ENTREGADO ANTES
+    ]
+
+    estados = [
+        ESTADOS.index('SIN FECHA REAL (COMPLETO)'),
+        CODIGO_NO_ENTREGADO,
+        CODIGO_NO_ENTREGADO,
+        ESTADOS.index('OTIF'),
+        ESTADOS.index('EXCEPCIÓN (2 DÍAS TARDE)'),
+        ESTADOS.index('ENTREGADO TARDE'),
+        ESTADOS.index('ENTREGADO ANTES')
+    ]
+
+    codigos = np.select(condiciones, estados, default=CODIGO_NO_ENTREGADO).astype(np.int8)
+    return dias_diferencia, codigos
+
+def _como_ns(serie):
+    """Array datetime64[ns] de una columna de fechas (NaT incluidos)"""
+    return serie.to_numpy(dtype='datetime64[ns]')
+
+def estados_categoricos(codigos):
+    """Estado como categórica sobre los códigos int8, sin crear una cadena por línea"""
+    return pd.Categorical.from_codes(codigos, categories=ESTADOS)
+
+def clasificar_estados(fecha_esperada, fecha_real, cantidad_pendiente):
+    """Aplica las reglas del diagrama de flujo y devuelve (días diferencia, estado)"""
+    dias_diferencia, codigos = _clasificar(
+        _como_ns(fecha_esperada), _como_ns(fecha_real),
+        cantidad_pendiente.to_numpy(dtype='float64', na_value=np.nan)
+    )
+    return pd.Series(dias_diferencia, index=fecha_real.index), estados_categoricos(codigos)
+
+def es_otif(df_otif):
+    """Máscara de las líneas OTIF (se calcula del Estado en lugar de guardarse por línea)"""
+    return df_otif['Estado'].isin(ESTADOS_OTIF)
+
+def cantidad_entregada(df_otif):
+    """Cantidad entregada de cada línea (total menos pendiente), calculada al usarla"""
+    return df_otif['Cantidad Total'] - df_otif['Cantidad Pendiente']
+
+def _float_compacto(serie):
+    """float32 si la columna cabe sin perder precisión (cantidades enteras, lo habitual); si no, float64"""
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    compactos = valores.astype(np.float32)
+    if np.array_equal(compactos, valores, equal_nan=True):
+        return pd.Series(compactos, index=serie.index)
+    return pd.Series(valores, index=serie.index)
+
+def _proveedores_categoricos(codigos_proveedor, nombres):
+    """Nombre de proveedor como categórica: una búsqueda y una cadena por código distinto, no por línea"""
+    posiciones, codigos_unicos = pd.factorize(codigos_proveedor)
+    if nombres is None:
+        nombres = obtener_nombres_proveedores(codigos_unicos)
+    etiquetas = [nombres.get(int(codigo), f"Proveedor {codigo}") for codigo in codigos_unicos]
+    # Sin código factorize devuelve -1: se agrupan en su propio proveedor, no en el último de la lista
+    sin_codigo = posiciones == -1
+    if sin_codigo.any():
+        posiciones = np.where(sin_codigo, len(etiquetas), posiciones)
+        etiquetas.append(PROVEEDOR_DESCONOCIDO)
+    # Dos códigos pueden tener el mismo nombre: las categorías no pueden repetirse
+    categorias, inversa = np.unique(np.array(etiquetas, dtype=object), return_inverse=True)
+    return pd.Categorical.from_codes(inversa[posiciones], categories=categorias)
+
+def _componer_resultado(df, fechas, dias_diferencia, estados, nombres):
+    """Monta df_result a partir de las columnas de entrada y la clasificación ya calculada.
+
+    Los tipos son compactos: texto repetido como categórica, cantidades en float32 cuando
+    no se pierde precisión y días en int32. Cantidad Entregada y Es OTIF no se guardan: ver cantidad_entregada y es_otif.
+    """
+
+    # Crear DataFrame de resultados usando operaciones vectorizadas
+    df_result = pd.DataFrame()
+
+    # Copiar columnas necesarias
+    df_result['Nº documento'] = df['Nº documento']
+    df_result['Código Proveedor'] = df['Compra a-Nº proveedor']
+    df_result['Nº Artículo'] = df['Nº']
+    df_result['Descripción'] = df['Descripción']
+    df_result['Almacén'] = df['Cód. almacén']
+    for col in COLUMNAS_CATEGORICAS:
+        df_result[col] = df_result[col].astype('category')
+
+    # Fechas ya convertidas
+    df_result['Fecha Esperada'] = fechas['Fecha recepción esperada']
+    df_result['Fecha Real'] = fechas['Fecha recepción real']
+    df_result['Fecha Pedido'] = fechas['Fecha pedido']
+
+    # Cantidades
+    df_result['Cantidad Total'] = _float_compacto(df['Cantidad (base)'])
+    df_result['Cantidad Pendiente'] = _float_compacto(df['Cdad. pendiente (base)'])
+    df_result['Coste Unitario'] = _float_compacto(df['Coste unit. directo excl. IVA'])
+
+    # int32: una fecha mal tecleada en el ERP puede estar a más de 32767 días
+    df_result['Días Diferencia'] = dias_diferencia.astype(np.int32)
+    df_result['Estado'] = estados
+
+    df_result['Proveedor'] = _proveedores_categoricos(df_result['Código Proveedor'], nombres)
+
+    return df_result
+
+def calcular_otif(df, nombres=None):
+    """Calcula el OTIF según la lógica del diagrama de flujo - VERSIÓN OPTIMIZADA"""
+    # Convertir fechas
+    fechas = {col: pd.to_datetime(df[col]) for col in COLUMNAS_FECHA}
+
+    dias_diferencia, estados = clasificar_estados(
+        fechas['Fecha recepción esperada'], fechas['Fecha recepción real'], df['Cdad. pendiente (base)']
+    )
+
+    return _componer_resultado(df, fechas, dias_diferencia.to_numpy(), estados, nombres)
+
+def _abrir_compartido(nombre):
+    """Se conecta a un bloque de memoria compartida creado por el proceso principal"""
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Python < 3.13: los hijos comparten el resource tracker del padre, que es quien hace unlink
+        return shared_memory.SharedMemory(name=nombre)
+
+def _clasificar_rango(bloques, n, inicio, fin):
+    """Trabajo de cada proceso: clasifica las filas [inicio, fin) directamente sobre memoria compartida"""
+    abiertos = {clave: _abrir_compartido(nombre) for clave, (nombre, _) in bloques.items()}
+    try:
+        arrays = {
+            clave: np.ndarray((n,), dtype=dtype, buffer=abiertos[clave].buf)
+            for clave, (_, dtype) in bloques.items()
+        }
+        dias, codigos = _clasificar(
+            arrays['esperada'][inicio:fin], arrays['real'][inicio:fin], arrays['pendiente'][inicio:fin]
+        )
+        arrays['dias'][inicio:fin] = dias
+        arrays['codigos'][inicio:fin] = codigos
+        del arrays
+    finally:
+        for shm in abiertos.values():
+            shm.close()
+    return fin - inicio
+
+def _parsear_fechas(valores):
+    """Trabajo de cada proceso: convierte un trozo de una columna de fechas"""
+    return pd.to_datetime(pd.Series(valores)).to_numpy()
+
+_pool = None
+_pool_procesos = 0
+
+def _obtener_pool(procesos):
+    """Pool de procesos reutilizado entre cálculos (arrancarlo cuesta más que clasificar)"""
+    global _pool, _pool_procesos
+    if _pool is None or _pool_procesos != procesos:
+        if _pool is not None:
+            _pool.shutdown()
+        metodos = multiprocessing.get_all_start_methods()
+        # forkserver/spawn: no heredar los hilos del servidor de Streamlit
+        contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+        _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=contexto)
+        _pool_procesos = procesos
+    return _pool
+
+def _descartar_pool():
+    """Olvida el pool roto (un proceso murió): el siguiente cálculo arranca uno nuevo"""
+    global _pool, _pool_procesos
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _pool_procesos = 0
+
+def _rangos(n, partes):
+    """Divide [0, n) en rangos contiguos de tamaño similar"""
+    limites = np.linspace(0, n, partes + 1).astype(int)
+    return [(inicio, fin) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+
+def calcular_otif_paralelo(df, procesos=None, nombres=None):
+    """Calcula el OTIF repartiendo las líneas por rangos de filas entre varios procesos"""
+    procesos = procesos or os.cpu_count() or 1
+    n = len(df)
+    if procesos <= 1 or n < MIN_FILAS_PARALELO:
+        return calcular_otif(df, nombres)
+
+    try:
+        return _calcular_otif_en_pool(df, _obtener_pool(procesos), procesos, nombres)
+    except BrokenProcessPool as e:
+        # Un proceso murió (p. ej. por falta de memoria) y el pool ya no sirve: se descarta y
+        # este cálculo se hace en serie
+        _descartar_pool()
+        print(f"Nota: el pool de procesos se ha roto, se calcula en serie: {e}")
+        return calcular_otif(df, nombres)
+
+def _calcular_otif_en_pool(df, pool, procesos, nombres):
+    """Cálculo de calcular_otif_paralelo sobre un pool ya arrancado"""
+    n = len(df)
+    rangos = _rangos(n, procesos)
+
+    # Convertir fechas: solo se paraleliza si no vienen ya como datetime (la ingesta las tipa)
+    fechas = {}
+    for col in COLUMNAS_FECHA:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            fechas[col] = df[col]
+        else:
+            valores = df[col].to_numpy()
+            trozos = pool.map(_parsear_fechas, [valores[inicio:fin] for inicio, fin in rangos])
+            fechas[col] = pd.Series(np.concatenate(list(trozos)), index=df.index)
+
+    # Entradas y salidas en memoria compartida: los procesos no copian ni devuelven arrays
+    entradas = {
+        'esperada': _como_ns(fechas['Fecha recepción esperada']),
+        'real': _como_ns(fechas['Fecha recepción real']),
+        'pendiente': df['Cdad. pendiente (base)'].to_numpy(dtype='float64', na_value=np.nan),
+        'dias': np.zeros(n, dtype=np.int64),
+        'codigos': np.zeros(n, dtype=np.int8),
+    }
+    compartidos = {}
+    try:
+        for clave, array in entradas.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            compartidos[clave] = shm
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        bloques = {clave: (shm.name, entradas[clave].dtype.str) for clave, shm in compartidos.items()}
+
+        futuros = [pool.submit(_clasificar_rango, bloques, n, inicio, fin) for inicio, fin in rangos]
+        for futuro in futuros:
+            futuro.result()
+
+        dias_diferencia = np.ndarray((n,), dtype=np.int64, buffer=compartidos['dias'].buf).copy()
+        codigos = np.ndarray((n,), dtype=np.int8, buffer=compartidos['codigos'].buf).copy()
+    finally:
+        for shm in compartidos.values():
+            shm.close()
+            shm.unlink()
+
+    return _componer_resultado(df, fechas, dias_diferencia, estados_categoricos(codigos), nombres)
+
+def calcular_otif_por_lotes(ruta, destino, tam_lote=TAM_LOTE, nombres=None):
+    """Calcula el OTIF lote a lote y lo escribe en un Parquet, sin cargar el archivo entero"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Los nombres se cargan una sola vez para todos los lotes
+    if nombres is None:
+        nombres = obtener_nombres_proveedores()
+
+    destino_tmp = f"{destino}.{os.getpid()}.tmp"
+    writer = None
+    total_lineas = 0
+
+    try:
+        for lote in leer_lotes_pedidos(ruta, tam_lote):
+            tabla = pa.Table.from_pandas(calcular_otif(lote, nombres), preserve_index=False)
+            if writer is None:
+                # Los tipos compactos dependen del lote (índices int8/int16 de las categóricas,
+                # float32 solo si cabe): se fija el más amplio para que todos los lotes encajen
+                esquema = pa.schema([
+                    campo.with_type(pa.dictionary(pa.int32(), campo.type.value_type))
+                    if pa.types.is_dictionary(campo.type)
+                    else campo.with_type(pa.float64()) if pa.types.is_float32(campo.type) else campo
+                    for campo in tabla.schema
+                ], metadata=tabla.schema.metadata)
+                writer = pq.ParquetWriter(destino_tmp, esquema)
+                tabla = tabla.cast(esquema)
+            else:
+                # Un lote con una columna vacía puede inferir otro tipo: se fuerza el del primero
+                tabla = tabla.cast(writer.schema)
+            writer.write_table(tabla)
+            total_lineas += len(lote)
+    except BaseException:
+        # No dejar un resultado a medias en disco
+        if writer is not None:
+            writer.close()
+            os.remove(destino_tmp)
+        raise
+
+    if writer is not None:
+        writer.close()
+        os.replace(destino_tmp, destino)
+
+    return total_lineas
+
+def ordenar_por_fecha(df_otif):
+    """Ordena las líneas por Fecha Esperada (NaT al final) para filtrar periodos por búsqueda binaria"""
+    return df_otif.sort_values('Fecha Esperada', kind='stable', na_position='last').reset_index(drop=True)
+
+def filtrar_por_fechas(df_otif, fecha_inicio=None, fecha_fin=None, columna='Fecha Esperada'):
+    """Filas con la fecha entre dos días incluidos; df_otif debe estar ordenado por esa columna"""
+    fechas = df_otif[columna].to_numpy()
+    inicio = 0
+    fin = np.searchsorted(fechas, np.datetime64('NaT'), side='left')
+    if fecha_inicio is not None:
+        inicio = np.searchsorted(fechas, np.datetime64(fecha_inicio, 'D'), side='left')
+    if fecha_fin is not None:
+        # Hasta el final del día: primer instante del día siguiente, excluido
+        fin = np.searchsorted(fechas, np.datetime64(fecha_fin, 'D') + np.timedelta64(1, 'D'), side='left')
+    return df_otif.iloc[inicio:fin]
+
+def pedidos_pendientes(df_otif, hoy):
+    """Líneas NO ENTREGADO con fecha esperada hasta hoy y sus días de retraso; df_otif ordenado por fecha"""
+    df_hasta_hoy = filtrar_por_fechas(df_otif, fecha_fin=hoy)
+    pendientes = df_hasta_hoy[df_hasta_hoy['Estado'] == 'NO ENTREGADO'].copy()
+    dias_esperados = pendientes['Fecha Esperada'].to_numpy().astype('datetime64[D]')
+    pendientes['Días Retraso'] = (np.datetime64(hoy, 'D') - dias_esperados).astype(np.int64)
+    return pendientes
+
+def calcular_metricas_proveedor(df_otif):
+    """Calcula métricas de OTIF por proveedor"""
+    # Columnas derivadas solo para la agregación, sumadas en float64/int64 como antes de compactar
+    lineas = pd.DataFrame({
+        'Proveedor': df_otif['Proveedor'],
+        'Es OTIF': es_otif(df_otif),
+        'Cantidad Total': df_otif['Cantidad Total'].astype('float64'),
+        'Cantidad Entregada': cantidad_entregada(df_otif).astype('float64'),
+        'Días Diferencia': df_otif['Días Diferencia'].astype('int64')
+    })
+    metricas = lineas.groupby('Proveedor', observed=True).agg({
+        'Es OTIF': ['sum', 'count'],
+        'Cantidad Total': 'sum',
+        'Cantidad Entregada': 'sum',
+        'Días Diferencia': 'mean'
+    }).reset_index()
+
+    metricas.columns = ['Proveedor', 'OTIF Count', 'Total Pedidos',
+                        'Cantidad Total', 'Cantidad Entregada', 'Días Diferencia Promedio']
+
+    metricas['% OTIF'] = (metricas['OTIF Count'] / metricas['Total Pedidos'] * 100).round(2)
+    metricas['% Fill Rate'] = (metricas['Cantidad Entregada'] / metricas['Cantidad Total'] * 100).round(2)
+
+    return metricas
+
+def particionar_por_proveedor(df_otif):
+    """Posiciones de las líneas de cada proveedor (proveedor -> array de posiciones), en una sola pasada"""
+    return df_otif.groupby('Proveedor', sort=False, observed=True).indices
+
+def lineas_proveedor(df_otif, particion, proveedor):
+    """Líneas de un proveedor usando la partición, sin recorrer el DataFrame con una máscara"""
+    return df_otif.take(particion.get(proveedor, []))
@@ -0,0 +1,240 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+# pandas/numpy se importan dentro de las funciones que los usan: la portada de la app
+# solo consulta el directorio y así no paga su importación
+
+# Ruta de la base de datos
+DB_PATH = "proveedores.db"
+
+class DirectorioProveedores:
+    """Conexión única por proceso a la base de datos y mapa en memoria código -> (nombre, alias, email)"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self._mapa = None
+        self._huella_nombres = None
+
+    def conexion(self):
+        """Conexión compartida; se reabre si el proceso es un fork del original"""
+        with self.lock:
+            if self._conn is None or self._pid != os.getpid():
+                # Streamlit atiende cada sesión en su propio hilo: acceso serializado con el lock.
+                # Sin journal_mode=WAL: cambiaría la cabecera de proveedores.db, que está en el repositorio
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                # La tabla se crea (o migra) una vez por conexión, no en cada rerun
+                _init_db(self._conn)
+                self._pid = os.getpid()
+                self._mapa = None
+            return self._conn
+
+    def mapa(self):
+        """Diccionario código -> (nombre, alias, email), leído una vez hasta la próxima invalidación"""
+        mapa = self._mapa
+        if mapa is None:
+            with self.lock:
+                filas = self.conexion().execute('SELECT codigo, nombre, alias, email FROM proveedores').fetchall()
+                mapa = {codigo: (nombre, alias, email) for codigo, nombre, alias, email in filas}
+                self._mapa = mapa
+        return mapa
+
+    def huella_nombres(self):
+        """Huella de los nombres visibles (alias o nombre) por código, calculada una vez por mapa"""
+        mapa = self.mapa()
+        huella = self._huella_nombres
+        if huella is None or huella[0] is not mapa:
+            nombres = sorted((codigo, alias or nombre) for codigo, (nombre, alias, _) in mapa.items())
+            huella = (mapa, hashlib.sha256(repr(nombres).encode('utf-8')).hexdigest())
+            self._huella_nombres = huella
+        return huella[1]
+
+    def invalidar(self):
+        """Descarta el mapa en memoria tras escribir en la tabla de proveedores"""
+        self._mapa = None
+
+_directorio = None
+
+def directorio():
+    """Directorio de proveedores del proceso (se crea al primer uso)"""
+    global _directorio
+    if _directorio is None or _directorio.db_path != DB_PATH:
+        _directorio = DirectorioProveedores(DB_PATH)
+    return _directorio
+
+# Funciones de base de datos
+def _init_db(conn):
+    """Crea la tabla de proveedores y migra las columnas que falten"""
+    cursor = conn.cursor()
+    
+    # Crear tabla si no existe
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS proveedores (
+            codigo INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            alias TEXT,
+            tipo TEXT,
+            responsable_compras TEXT,
+            centro_responsabilidad TEXT,
+            almacen TEXT,
+            email TEXT,
+            fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Verificar si la columna email existe, si no, añadirla
+    cursor.execute("PRAGMA table_info(proveedores)")
+    columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'email' not in columns:
+        try:
+            cursor.execute('ALTER TABLE proveedores ADD COLUMN email TEXT')
+            conn.commit()
+            print("✅ Columna 'email' añadida a la tabla proveedores")
+        except Exception as e:
+            print(f"Nota: {e}")
+    
+    conn.commit()
+
+# Columnas del Excel de proveedores -> columnas de la tabla (Nº y Nombre son obligatorias)
+COLUMNAS_EXCEL_PROVEEDORES = {
+    'Nº': 'codigo',
+    'Nombre': 'nombre',
+    'Alias': 'alias',
+    'Tipo Proveedor': 'tipo',
+    'Responsable compras': 'responsable_compras',
+    'Centro responsabilidad': 'centro_responsabilidad',
+    'Cód. almacén': 'almacen',
+    'Correo electrónico': 'email'
+}
+CAMPOS_PROVEEDOR = list(COLUMNAS_EXCEL_PROVEEDORES.values())
+
+def limpiar_excel_proveedores(df_excel):
+    """Limpia el Excel de proveedores columna a columna y lo deja con las columnas de la tabla"""
+    import pandas as pd
+
+    df = pd.DataFrame(index=df_excel.index)
+    df['codigo'] = pd.to_numeric(df_excel['Nº']).astype('int64')
+    df['nombre'] = df_excel['Nombre'].astype(str)
+
+    # Las columnas opcionales que falten o estén vacías se guardan como texto vacío
+    for columna_excel, campo in list(COLUMNAS_EXCEL_PROVEEDORES.items())[2:]:
+        if columna_excel in df_excel.columns:
+            df[campo] = df_excel[columna_excel].fillna('').astype(str)
+        else:
+            df[campo] = ''
+
+    # Si un código se repite gana la última fila, como con INSERT OR REPLACE
+    return df.drop_duplicates('codigo', keep='last')
+
+def _filas(df):
+    """Filas como tuplas de tipos nativos de Python, listas para executemany"""
+    return list(zip(*(df[campo].tolist() for campo in CAMPOS_PROVEEDOR)))
+
+def cargar_proveedores_desde_excel(df_excel, incremental=False):
+    """Carga proveedores desde un DataFrame de Excel a la base de datos.
+
+    Con incremental=True solo inserta o actualiza los proveedores nuevos o que han cambiado
+    y conserva el resto; si no, reemplaza la tabla entera. Devuelve un resumen de la carga.
+    """
+    df = limpiar_excel_proveedores(df_excel)
+
+    dir_proveedores = directorio()
+    with dir_proveedores.lock:
+        conn = dir_proveedores.conexion()
+        if incremental:
+            resumen = _upsert_proveedores(conn, df)
+        else:
+            resumen = _reemplazar_proveedores(conn, df)
+    dir_proveedores.invalidar()
+
+    return resumen
+
+def _reemplazar_proveedores(conn, df):
+    """Reemplaza el contenido de la tabla de proveedores en una sola transacción"""
+    columnas = ', '.join(CAMPOS_PROVEEDOR)
+    placeholders = ', '.join(['?'] * len(CAMPOS_PROVEEDOR))
+
+    with conn:
+        eliminados = conn.execute('DELETE FROM proveedores').rowcount
+        conn.executemany(f'INSERT OR REPLACE INTO proveedores ({columnas}) VALUES ({placeholders})', _filas(df))
+
+    return {'insertados': len(df), 'actualizados': 0, 'sin_cambios': 0, 'eliminados': eliminados}
+
+def _upsert_proveedores(conn, df):
+    """Inserta o actualiza solo los proveedores que difieren de lo guardado, en una transacción"""
+    import numpy as np
+    import pandas as pd
+
+    existentes = pd.read_sql_query(f'SELECT {", ".join(CAMPOS_PROVEEDOR)} FROM proveedores', conn)
+    existentes = existentes.fillna('')
+
+    comparacion = df.merge(existentes, on='codigo', how='left', suffixes=('', '_bd'), indicator=True)
+    nuevos = (comparacion['_merge'] == 'left_only').to_numpy()
+    cambiados = np.zeros(len(comparacion), dtype=bool)
+    for campo in CAMPOS_PROVEEDOR[1:]:
+        cambiados |= (comparacion[campo] != comparacion[f'{campo}_bd'].astype(str)).to_numpy()
+    cambiados &= ~nuevos
+
+    a_escribir = df[nuevos | cambiados]
+    columnas = ', '.join(CAMPOS_PROVEEDOR)
+    placeholders = ', '.join(['?'] * len(CAMPOS_PROVEEDOR))
+    actualizar = ', '.join(f'{campo} = excluded.{campo}' for campo in CAMPOS_PROVEEDOR[1:])
+
+    with conn:
+        conn.executemany(f'''
+            INSERT INTO proveedores ({columnas}) VALUES ({placeholders})
+            ON CONFLICT(codigo) DO UPDATE SET {actualizar}, fecha_actualizacion = CURRENT_TIMESTAMP
+        ''', _filas(a_escribir))
+
+    return {
+        'insertados': int(nuevos.sum()),
+        'actualizados': int(cambiados.sum()),
+        'sin_cambios': int(len(df) - len(a_escribir)),
+        'eliminados': 0
+    }
+
+def obtener_email_proveedor(codigo):
+    """Obtiene el email de un proveedor por su código"""
+    try:
+        result = directorio().mapa().get(int(codigo))
+        
+        if result and result[2]:
+            return result[2]
+        else:
+            return None
+    except:
+        return None
+
+def obtener_nombres_proveedores(codigos=None):
+    """Obtiene en batch el nombre visible (alias o nombre) de varios proveedores"""
+    mapa = directorio().mapa()
+    if codigos is None:
+        codigos = mapa.keys()
+    
+    nombres_dict = {}
+    for codigo in codigos:
+        result = mapa.get(int(codigo))
+        if result:
+            nombres_dict[int(codigo)] = result[1] if result[1] else result[0]
+    
+    return nombres_dict
+
+def huella_nombres_proveedores():
+    """Huella de los nombres de proveedor: los resultados que los incluyen se cachean con ella"""
+    return directorio().huella_nombres()
+
+def contar_proveedores():
+    """Número de proveedores en la base de datos, sin leer la tabla con pandas"""
+    try:
+        return len(directorio().mapa())
+    except:
+        return 0
+
+def hay_proveedores_en_bd():
+    """Verifica si hay proveedores en la base de datos"""
+    return contar_proveedores() > 0
@@ -0,0 +1,923 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from otif import es_otif
+
+# Las plantillas se formatean con str.format: las filas de las tablas se renderizan
+# en una sola pasada sobre arrays de columnas ya formateadas y se unen con ''.join
+
+FORMATO_FECHA = '%d/%m/%Y'
+
+ESTADOS_ATRASADO = ['ENTREGADO TARDE', 'EXCEPCIÓN (2 DÍAS TARDE)']
+
+def _fechas(serie, vacio='N/A'):
+    """Columna de fechas formateada como dd/mm/aaaa"""
+    return serie.dt.strftime(FORMATO_FECHA).fillna(vacio).tolist()
+
+def _unidades(serie):
+    """Columna de cantidades formateada sin decimales"""
+    return [f"{valor:.0f}" for valor in serie.tolist()]
+
+def _renderizar_filas(plantilla, *columnas):
+    """Renderiza la plantilla de fila para cada posición de las columnas en una sola pasada"""
+    return ''.join(map(plantilla.format, *columnas))
+
+def _generado_el():
+    """Fecha y hora de generación para los pies de los documentos"""
+    return datetime.now().strftime('%d/%m/%Y a las %H:%M')
+
+# ---------------------------------------------------------------------------
+# Reporte OTIF del proveedor
+# ---------------------------------------------------------------------------
+
+_ESTILOS_REPORTE = """
+        <style>
+            body {{
+                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 1000px;
+                margin: 0 auto;
+                padding: 20px;
+                background-color: #f9f9f9;
+            }}
+            .header {{
+                background: linear-gradient(135deg, {color} 0%, #B8A898 100%);
+                color: white;
+                padding: 40px;
+                text-align: center;
+                border-radius: 15px;
+                margin-bottom: 30px;
+                box-shadow: 0 8px 16px rgba(0, 0, 0, 0.2);
+            }}
+            .header h1 {{
+                margin: 0;
+                font-size: 2.5em;
+                text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+            }}
+            .header .periodo {{
+                font-size: 1.1em;
+                margin-top: 10px;
+                opacity: 0.95;
+            }}
+            .estado-badge {{
+                display: inline-block;
+                background: white;
+                color: {color};
+                padding: 10px 25px;
+                border-radius: 25px;
+                font-weight: bold;
+                font-size: 1.2em;
+                margin-top: 15px;
+                box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+            }}
+            .metrics {{
+                display: flex;
+                justify-content: space-around;
+                margin: 30px 0;
+                flex-wrap: wrap;
+                gap: 20px;
+            }}
+            .metric-box {{
+                background: white;
+                border-radius: 15px;
+                padding: 25px;
+                text-align: center;
+                min-width: 180px;
+                flex: 1;
+                box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+                transition: transform 0.3s;
+            }}
+            .metric-box:hover {{
+                transform: translateY(-5px);
+                box-shadow: 0 6px 20px rgba(0,0,0,0.15);
+            }}
+            .metric-value {{
+                font-size: 3em;
+                font-weight: bold;
+                color: {color};
+                margin: 10px 0;
+            }}
+            .metric-label {{
+                font-size: 0.95em;
+                color: #666;
+                text-transform: uppercase;
+                letter-spacing: 1px;
+            }}
+            .metric-icon {{
+                font-size: 2em;
+                margin-bottom: 10px;
+            }}
+            .chart-container {{
+                text-align: center;
+                margin: 40px 0;
+                background: white;
+                padding: 30px;
+                border-radius: 15px;
+                box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+            }}
+            .chart-container h3 {{
+                color: {color};
+                margin-bottom: 20px;
+            }}
+            table {{
+                width: 100%;
+                border-collapse: collapse;
+                margin: 20px 0;
+                background: white;
+                box-shadow: 0 4px 12px rgba(0,0,0,0.1);
+                border-radius: 10px;
+                overflow: hidden;
+            }}
+            th {{
+                background-color: {color};
+                color: white;
+                padding: 15px;
+                text-align: left;
+                font-weight: bold;
+                font-size: 0.95em;
+            }}
+            td {{
+                padding: 12px 15px;
+                border-bottom: 1px solid #eee;
+            }}
+            tr:last-child td {{
+                border-bottom: none;
+            }}
+            tr:hover {{
+                background-color: #f8f8f8;
+            }}
+            .section-title {{
+                color: {color};
+                font-size: 1.8em;
+                margin-top: 40px;
+                padding-bottom: 10px;
+                border-bottom: 3px solid {color};
+                display: flex;
+                align-items: center;
+                gap: 10px;
+            }}
+            .footer {{
+                text-align: center;
+                margin-top: 50px;
+                padding: 30px;
+                background: linear-gradient(135deg, #f5f5f5 0%, #e9e9e9 100%);
+                border-radius: 15px;
+                color: #666;
+            }}
+            .footer-logo {{
+                font-size: 1.5em;
+                font-weight: bold;
+                color: {color};
+                margin-bottom: 10px;
+            }}
+            .alert {{
+                background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
+                border-left: 5px solid #ffc107;
+                padding: 20px;
+                margin: 25px 0;
+                border-radius: 10px;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            }}
+            .alert-title {{
+                font-weight: bold;
+                font-size: 1.2em;
+                margin-bottom: 10px;
+                color: #856404;
+            }}
+            .priority-high {{
+                background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
+                border-left: 5px solid #dc3545;
+            }}
+            .priority-high .alert-title {{
+                color: #721c24;
+            }}
+            .icon {{
+                display: inline-block;
+                margin-right: 8px;
+            }}
+            .badge {{
+                display: inline-block;
+                padding: 5px 12px;
+                border-radius: 12px;
+                font-size: 0.85em;
+                font-weight: bold;
+                margin-left: 8px;
+            }}
+            .badge-danger {{
+                background: #dc3545;
+                color: white;
+            }}
+            .badge-warning {{
+                background: #ffc107;
+                color: #333;
+            }}
+            .badge-success {{
+                background: #28a745;
+                color: white;
+            }}
+        </style>"""
+
+_CABECERA_REPORTE = """
+    <html>
+    <head>
+        <meta charset="UTF-8">{estilos}
+    </head>
+    <body>
+        <div class="header">
+            <h1>📦 REPORTE OTIF</h1>
+            <h2>{nombre}</h2>
+            <div class="periodo">📅 Período: {desde} - {hasta}</div>
+            <div class="estado-badge">{estado}</div>
+        </div>
+
+        <div class="metrics">
+            <div class="metric-box">
+                <div class="metric-icon">📋</div>
+                <div class="metric-value">{total}</div>
+                <div class="metric-label">Total Pedidos</div>
+            </div>
+            <div class="metric-box">
+                <div class="metric-icon">{icono_otif}</div>
+                <div class="metric-value">{otif_pct:.1f}%</div>
+                <div class="metric-label">% OTIF</div>
+            </div>
+            <div class="metric-box">
+                <div class="metric-icon">❌</div>
+                <div class="metric-value">{no_entregados}</div>
+                <div class="metric-label">No Entregados</div>
+            </div>
+            <div class="metric-box">
+                <div class="metric-icon">⏰</div>
+                <div class="metric-value">{atrasados}</div>
+                <div class="metric-label">Atrasados</div>
+            </div>
+        </div>
+
+        <div class="chart-container">
+            <h3>📊 Análisis Visual de Cumplimiento</h3>
+            <img src="data:image/png;base64,{imagen}" alt="Gráfico OTIF" style="max-width: 100%; height: auto; border-radius: 10px;">
+        </div>
+    """
+
+_SECCION_NO_ENTREGADOS = """
+        <h2 class="section-title"><span class="icon">❌</span> Pedidos NO ENTREGADOS<span class="badge badge-danger">{total}</span></h2>
+        <div class="alert priority-high">
+            <div class="alert-title">⚠️ ACCIÓN REQUERIDA</div>
+            Los siguientes pedidos están pendientes de entrega. Por favor, priorice su envío.
+        </div>
+        <table>
+            <tr>
+                <th>Nº Documento</th>
+                <th>Artículo</th>
+                <th>Descripción</th>
+                <th>Fecha Esperada</th>
+                <th>Cantidad Pendiente</th>
+                <th>Días Retraso</th>
+            </tr>
+        {filas}</table>"""
+
+# Nº documento, artículo, descripción, fecha esperada, cantidad pendiente, días de retraso, color fila, color días
+_FILA_NO_ENTREGADO = """
+            <tr style="background-color: {6}">
+                <td><strong>{0}</strong></td>
+                <td>{1}</td>
+                <td>{2}</td>
+                <td>{3}</td>
+                <td>{4}</td>
+                <td><strong style="color: {7}">{5} días</strong></td>
+            </tr>
+            """
+
+_SECCION_ATRASADOS = """
+        <h2 class="section-title"><span class="icon">⚠️</span> Pedidos ATRASADOS<span class="badge badge-warning">{total}</span></h2>
+        <div class="alert">
+            <div class="alert-title">📋 PARA SU CONOCIMIENTO</div>
+            Estos pedidos se entregaron con retraso. Le pedimos mejorar la puntualidad en futuros envíos.
+        </div>
+        <table>
+            <tr>
+                <th>Nº Documento</th>
+                <th>Artículo</th>
+                <th>Fecha Esperada</th>
+                <th>Fecha Real</th>
+                <th>Días Diferencia</th>
+                <th>Estado</th>
+            </tr>
+        {filas}</table>"""
+
+# Nº documento, artículo, fecha esperada, fecha real, días diferencia, estado
+_FILA_ATRASADO = """
+            <tr>
+                <td><strong>{0}</strong></td>
+                <td>{1}</td>
+                <td>{2}</td>
+                <td>{3}</td>
+                <td><strong style="color: #f57c00">+{4} días</strong></td>
+                <td>{5}</td>
+            </tr>
+            """
+
+_SECCION_ENTREGADOS = """
+        <h2 class="section-title"><span class="icon">✅</span> Pedidos ENTREGADOS CORRECTAMENTE<span class="badge badge-success">{total}</span></h2>
+        <p style="color: #28a745; font-weight: bold; margin: 20px 0;">¡Excelente trabajo! Estos pedidos cumplieron con los plazos establecidos.</p>
+        <table>
+            <tr>
+                <th>Nº Documento</th>
+                <th>Artículo</th>
+                <th>Fecha Esperada</th>
+                <th>Fecha Real</th>
+                <th>Cantidad</th>
+            </tr>
+        {filas}{resto}</table>"""
+
+# Nº documento, artículo, fecha esperada, fecha real, cantidad
+_FILA_ENTREGADO = """
+            <tr>
+                <td><strong>{0}</strong></td>
+                <td>{1}</td>
+                <td>{2}</td>
+                <td>{3}</td>
+                <td>{4}</td>
+            </tr>
+            """
+
+_RESTO_ENTREGADOS = """<tr><td colspan='5' style='text-align:center; font-style:italic; padding: 15px; background: #f8f9fa;'>
+            ✨ ... y {resto} pedidos más cumplieron correctamente</td></tr>"""
+
+_PIE_REPORTE = """
+        <div class="footer">
+            <div class="footer-logo">🏠 KAVE HOME</div>
+            <p style="font-size: 1.1em; margin: 10px 0;"><strong>Planning Department</strong></p>
+            <p style="margin: 15px 0;">Este es un reporte automático del sistema de medición OTIF</p>
+            <p style="color: #999; font-size: 0.9em; margin-top: 20px;">
+                Para cualquier consulta o aclaración, por favor contacte con su responsable de compras
+            </p>
+            <p style="margin-top: 15px; font-size: 0.85em; color: #999;">
+                📧 Generado automáticamente el {generado}
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+
+# Máximo de pedidos OTIF listados en el reporte
+MAX_ENTREGADOS_REPORTE = 10
+
+@lru_cache(maxsize=None)
+def estilos_reporte(color_otif):
+    """Hoja de estilos del reporte para un color; se genera una sola vez por color"""
+    return _ESTILOS_REPORTE.format(color=color_otif)
+
+def clasificar_otif(otif_pct):
+    """Color y texto de estado según el % OTIF"""
+    if otif_pct >= 85:
+        return "#5B7C8D", "EXCELENTE"  # Azul (Excelente)
+    elif otif_pct >= 70:
+        return "#8B9AA5", "BUENO"  # Azul claro (Bueno)
+    elif otif_pct >= 50:
+        return "#D4C5B9", "MEJORABLE"  # Beige (Regular)
+    else:
+        return "#8B7355", "CRÍTICO"  # Marrón (Crítico)
+
+def _filas_no_entregados(no_entregados):
+    """Filas de la tabla de pedidos no entregados, con el retraso calculado por columnas"""
+    hoy = pd.Timestamp(datetime.now().date())
+    dias_retraso = (hoy - no_entregados['Fecha Esperada'].dt.normalize()).dt.days.fillna(0).astype('int64').to_numpy()
+    color_fila = np.select([dias_retraso > 30, dias_retraso > 15], ['#ffebee', '#fff9e6'], '')
+    color_dias = np.select([dias_retraso > 30, dias_retraso > 15], ['#d32f2f', '#f57c00'], '#333')
+
+    return _renderizar_filas(
+        _FILA_NO_ENTREGADO,
+        no_entregados['Nº documento'].tolist(),
+        no_entregados['Nº Artículo'].tolist(),
+        no_entregados['Descripción'].tolist(),
+        _fechas(no_entregados['Fecha Esperada']),
+        _unidades(no_entregados['Cantidad Pendiente']),
+        dias_retraso.tolist(),
+        color_fila.tolist(),
+        color_dias.tolist()
+    )
+
+def metricas_reporte(df_pedidos):
+    """Métricas de cabecera del reporte de un proveedor: % OTIF, líneas OTIF y total"""
+    otif_count = int(es_otif(df_pedidos).sum())
+    return {
+        'otif_pct': otif_count / len(df_pedidos) * 100 if len(df_pedidos) > 0 else 0,
+        'otif_count': otif_count,
+        'total': len(df_pedidos)
+    }
+
+def generar_reporte_proveedor_html(nombre_proveedor, df_pedidos, metricas, imagen_base64):
+    """Genera el HTML del reporte para el proveedor con diseño mejorado"""
+    # Separar pedidos por estado
+    no_entregados = df_pedidos[df_pedidos['Estado'] == 'NO ENTREGADO']
+    atrasados = df_pedidos[df_pedidos['Estado'].isin(ESTADOS_ATRASADO)]
+    entregados = df_pedidos[es_otif(df_pedidos)]
+
+    color_otif, estado_texto = clasificar_otif(metricas['otif_pct'])
+
+    partes = [_CABECERA_REPORTE.format(
+        estilos=estilos_reporte(color_otif),
+        nombre=nombre_proveedor,
+        desde=df_pedidos['Fecha Esperada'].min().strftime(FORMATO_FECHA),
+        hasta=df_pedidos['Fecha Esperada'].max().strftime(FORMATO_FECHA),
+        estado=estado_texto,
+        total=len(df_pedidos),
+        icono_otif='✅' if metricas['otif_pct'] >= 70 else '⚠️',
+        otif_pct=metricas['otif_pct'],
+        no_entregados=len(no_entregados),
+        atrasados=len(atrasados),
+        imagen=imagen_base64
+    )]
+
+    # Pedidos NO ENTREGADOS
+    if len(no_entregados) > 0:
+        partes.append(_SECCION_NO_ENTREGADOS.format(
+            total=len(no_entregados),
+            filas=_filas_no_entregados(no_entregados)
+        ))
+
+    # Pedidos ATRASADOS
+    if len(atrasados) > 0:
+        partes.append(_SECCION_ATRASADOS.format(
+            total=len(atrasados),
+            filas=_renderizar_filas(
+                _FILA_ATRASADO,
+                atrasados['Nº documento'].tolist(),
+                atrasados['Nº Artículo'].tolist(),
+                _fechas(atrasados['Fecha Esperada']),
+                _fechas(atrasados['Fecha Real']),
+                atrasados['Días Diferencia'].tolist(),
+                atrasados['Estado'].tolist()
+            )
+        ))
+
+    # Pedidos ENTREGADOS CORRECTAMENTE (solo los primeros)
+    if len(entregados) > 0:
+        primeros = entregados.head(MAX_ENTREGADOS_REPORTE)
+        resto = len(entregados) - len(primeros)
+        partes.append(_SECCION_ENTREGADOS.format(
+            total=len(entregados),
+            filas=_renderizar_filas(
+                _FILA_ENTREGADO,
+                primeros['Nº documento'].tolist(),
+                primeros['Nº Artículo'].tolist(),
+                _fechas(primeros['Fecha Esperada']),
+                _fechas(primeros['Fecha Real']),
+                _unidades(primeros['Cantidad Total'])
+            ),
+            resto=_RESTO_ENTREGADOS.format(resto=resto) if resto > 0 else ''
+        ))
+
+    partes.append(_PIE_REPORTE.format(generado=_generado_el()))
+
+    return ''.join(partes)
+
+_LINEA_RESUMEN = '━' * 33
+
+_CABECERA_TEXTO_REPORTE = """Estimado proveedor,
+
+Adjunto encontrará el reporte OTIF del período {desde} - {hasta}.
+
+RESUMEN:
+""" + _LINEA_RESUMEN + """
+• Total de pedidos: {total}
+• % OTIF: {otif_pct:.1f}%
+• Pedidos OTIF: {otif_count}
+• Pedidos no entregados: {no_entregados}
+• Pedidos atrasados: {atrasados}
+
+"""
+
+_PIE_TEXTO_REPORTE = """
+
+Para ver el reporte completo con gráficos, descargue el archivo HTML adjunto.
+
+Saludos cordiales,
+KAVE HOME - Planning Department
+"""
+
+# Máximo de pedidos listados por sección en el cuerpo de texto del reporte
+MAX_PEDIDOS_TEXTO = 10
+
+def _seccion_texto(titulo, pedidos, plantilla, *columnas):
+    """Sección del cuerpo de texto con los primeros pedidos y el recuento del resto"""
+    partes = [f"\n{titulo} ({len(pedidos)}):\n", _LINEA_RESUMEN + "\n", _renderizar_filas(plantilla, *columnas)]
+    if len(pedidos) > MAX_PEDIDOS_TEXTO:
+        partes.append(f"... y {len(pedidos) - MAX_PEDIDOS_TEXTO} pedidos más\n")
+    return ''.join(partes)
+
+def generar_reporte_proveedor_texto(df_pedidos, metricas, fecha_inicio, fecha_fin):
+    """Cuerpo en texto plano del email del reporte OTIF"""
+    no_entregados = df_pedidos[df_pedidos['Estado'] == 'NO ENTREGADO']
+    atrasados = df_pedidos[df_pedidos['Estado'].isin(ESTADOS_ATRASADO)]
+
+    partes = [_CABECERA_TEXTO_REPORTE.format(
+        desde=fecha_inicio.strftime(FORMATO_FECHA),
+        hasta=fecha_fin.strftime(FORMATO_FECHA),
+        total=len(df_pedidos),
+        otif_pct=metricas['otif_pct'],
+        otif_count=metricas['otif_count'],
+        no_entregados=len(no_entregados),
+        atrasados=len(atrasados)
+    )]
+
+    # Añadir pedidos NO ENTREGADOS
+    if len(no_entregados) > 0:
+        primeros = no_entregados.head(MAX_PEDIDOS_TEXTO)
+        hoy = pd.Timestamp(datetime.now().date())
+        dias_retraso = (hoy - primeros['Fecha Esperada'].dt.normalize()).dt.days.fillna(0).astype('int64')
+        partes.append(_seccion_texto(
+            "❌ PEDIDOS NO ENTREGADOS", no_entregados,
+            "• {0} - {1} - Fecha esperada: {2} ({3} días de retraso)\n",
+            primeros['Nº documento'].tolist(),
+            [descripcion[:50] for descripcion in primeros['Descripción'].astype(str)],
+            _fechas(primeros['Fecha Esperada']),
+            dias_retraso.tolist()
+        ))
+
+    # Añadir pedidos ATRASADOS
+    if len(atrasados) > 0:
+        primeros = atrasados.head(MAX_PEDIDOS_TEXTO)
+        partes.append(_seccion_texto(
+            "⚠️ PEDIDOS ATRASADOS", atrasados,
+            "• {0} - {1} - Retraso: {2} días\n",
+            primeros['Nº documento'].tolist(),
+            [descripcion[:50] for descripcion in primeros['Descripción'].astype(str)],
+            primeros['Días Diferencia'].tolist()
+        ))
+
+    partes.append(_PIE_TEXTO_REPORTE)
+
+    return ''.join(partes)
+
+# ---------------------------------------------------------------------------
+# Reclamaciones de pedidos pendientes
+# ---------------------------------------------------------------------------
+
+# Columnas de las líneas que usa la reclamación
+_COLUMNAS_RECLAMACION = [
+    'Nº documento', 'Nº Artículo', 'Descripción', 'Almacén', 'Fecha Esperada', 'Cantidad Pendiente', 'Días Retraso'
+]
+
+def modelo_reclamacion(pedidos_prov):
+    """Reclamación de un proveedor calculada una sola vez; los formatos HTML, texto y mailto se
+    renderizan a partir de ella.
+
+    Las líneas se ordenan por Nº documento y se agregan por documento en una pasada: datos de
+    su primera línea (fecha, almacén, retraso), número de líneas, unidades pendientes y rango de
+    posiciones. Las columnas de las líneas quedan ya formateadas para las plantillas.
+    """
+    pedidos = pedidos_prov[_COLUMNAS_RECLAMACION]
+    pedidos = pedidos[pedidos['Nº documento'].notna()]
+    pedidos = pedidos.take(np.argsort(pedidos['Nº documento'].to_numpy(), kind='stable'))
+
+    documentos = pedidos['Nº documento'].to_numpy()
+    cambios = np.ones(len(documentos), dtype=bool)
+    cambios[1:] = documentos[1:] != documentos[:-1]
+    inicios = np.flatnonzero(cambios)
+    fines = np.append(inicios[1:], len(pedidos))
+    lineas = fines - inicios
+
+    primeras = pedidos.iloc[inicios]
+    cantidades = pedidos['Cantidad Pendiente'].to_numpy(dtype='float64')
+    unidades = np.add.reduceat(cantidades, inicios) if len(inicios) else cantidades[:0]
+
+    return {
+        'resumen': resumen_reclamacion(pedidos_prov),
+        'documentos': {
+            'Nº documento': documentos[inicios].tolist(),
+            'Fecha Esperada': _fechas(primeras['Fecha Esperada']),
+            'Almacén': primeras['Almacén'].tolist(),
+            'Días Retraso': primeras['Días Retraso'].tolist(),
+            'Líneas': lineas.tolist(),
+            'Unidades': unidades.tolist(),
+            'Inicio': inicios.tolist(),
+            'Fin': fines.tolist()
+        },
+        'articulos': pedidos['Nº Artículo'].tolist(),
+        'descripciones': pedidos['Descripción'].tolist(),
+        'unidades': _unidades(pedidos['Cantidad Pendiente']),
+        # Numeración de cada línea dentro de su documento
+        'posiciones': (np.arange(len(pedidos)) - np.repeat(inicios, lineas) + 1).tolist()
+    }
+
+def _bloques_documento(plantilla_documento, documentos, filas):
+    """Inserta en cada bloque de documento sus filas de líneas ya renderizadas"""
+    return ''.join(
+        plantilla_documento.format(
+            documento=documento, fecha=fecha, almacen=almacen, dias=dias,
+            lineas=lineas, unidades=unidades, filas=''.join(filas[inicio:fin])
+        )
+        for documento, fecha, almacen, dias, lineas, unidades, inicio, fin in zip(
+            documentos['Nº documento'], documentos['Fecha Esperada'], documentos['Almacén'],
+            documentos['Días Retraso'], documentos['Líneas'], documentos['Unidades'],
+            documentos['Inicio'], documentos['Fin']
+        )
+    )
+
+_ESTILOS_RECLAMACION = """
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+                max-width: 1000px;
+                margin: 0 auto;
+                padding: 20px;
+            }
+            .header {
+                background: linear-gradient(135deg, #dc3545 0%, #c82333 100%);
+                color: white;
+                padding: 30px;
+                text-align: center;
+                border-radius: 10px;
+                margin-bottom: 30px;
+            }
+            .warning {
+                background: #fff3cd;
+                border-left: 5px solid #ffc107;
+                padding: 20px;
+                margin: 20px 0;
+                border-radius: 5px;
+            }
+            .pedido-grupo {
+                margin: 30px 0;
+                background: white;
+                border: 2px solid #dc3545;
+                border-radius: 10px;
+                overflow: hidden;
+            }
+            .pedido-header {
+                background: #dc3545;
+                color: white;
+                padding: 15px 20px;
+                font-size: 1.2em;
+                font-weight: bold;
+            }
+            table {
+                width: 100%;
+                border-collapse: collapse;
+            }
+            th {
+                background-color: #f8f9fa;
+                color: #333;
+                padding: 12px;
+                text-align: left;
+                font-weight: bold;
+                border-bottom: 2px solid #dee2e6;
+            }
+            td {
+                padding: 10px 12px;
+                border-bottom: 1px solid #dee2e6;
+            }
+            tr:hover {
+                background-color: #f8f9fa;
+            }
+            .resumen {
+                background: #f8f9fa;
+                padding: 20px;
+                border-radius: 10px;
+                margin: 20px 0;
+            }
+            .footer {
+                text-align: center;
+                margin-top: 40px;
+                padding: 20px;
+                background: #f8f9fa;
+                border-radius: 10px;
+                color: #666;
+            }
+        </style>"""
+
+_CABECERA_RECLAMACION = """
+    <html>
+    <head>{estilos}
+    </head>
+    <body>
+        <div class="header">
+            <h1>⚠️ RECLAMACIÓN</h1>
+            <h2>Pedidos Pendientes de Entrega</h2>
+            <p>KAVE HOME - Planning Department</p>
+        </div>
+
+        <p>Estimado proveedor,</p>
+        <p>Por medio de la presente, le informamos que los siguientes pedidos están <strong>PENDIENTES DE ENTREGA</strong> con retraso:</p>
+
+        <div class="warning">
+            <strong>⏰ ACCIÓN REQUERIDA URGENTE</strong><br>
+            Total de pedidos afectados: <strong>{lineas}</strong><br>
+            Retraso promedio: <strong>{retraso:.0f} días</strong>
+        </div>
+    """
+
+_DOCUMENTO_RECLAMACION = """
+        <div class="pedido-grupo">
+            <div class="pedido-header">
+                📋 Pedido: {documento} |
+                📅 Fecha esperada: {fecha} |
+                🏭 Almacén: {almacen} |
+                ⚠️ RETRASO: {dias} DÍAS
+            </div>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Artículo</th>
+                        <th>Descripción</th>
+                        <th style="text-align: right;">Cantidad Pendiente</th>
+                    </tr>
+                </thead>
+                <tbody>
+        {filas}
+                    <tr style="background-color: #fff3cd; font-weight: bold;">
+                        <td colspan="2" style="text-align: right;">TOTAL PEDIDO:</td>
+                        <td style="text-align: right;">{unidades:.0f} uds ({lineas} líneas)</td>
+                    </tr>
+                </tbody>
+            </table>
+        </div>
+        """
+
+# Artículo, descripción, cantidad pendiente
+_LINEA_RECLAMACION = """
+                    <tr>
+                        <td><strong>{0}</strong></td>
+                        <td>{1}</td>
+                        <td style="text-align: right;"><strong>{2}</strong> uds</td>
+                    </tr>
+            """
+
+_PIE_RECLAMACION = """
+        <div class="resumen">
+            <h3 style="color: #dc3545; margin-top: 0;">📊 RESUMEN TOTAL</h3>
+            <ul>
+                <li><strong>Pedidos afectados:</strong> {pedidos}</li>
+                <li><strong>Líneas de artículos:</strong> {lineas}</li>
+                <li><strong>Unidades pendientes:</strong> {unidades:.0f}</li>
+                <li><strong>Retraso promedio:</strong> {retraso:.0f} días</li>
+            </ul>
+        </div>
+
+        <div style="background: #fff3cd; padding: 20px; border-radius: 10px; border-left: 5px solid #ffc107; margin: 20px 0;">
+            <h3 style="margin-top: 0; color: #856404;">⚡ SOLICITAMOS URGENTEMENTE:</h3>
+            <ol>
+                <li><strong>Confirmación de fechas de envío</strong> para cada pedido</li>
+                <li><strong>Números de tracking/albaranes</strong> una vez realizados los envíos</li>
+                <li><strong>Plan de acción</strong> para evitar futuros retrasos</li>
+            </ol>
+        </div>
+
+        <p>Agradecemos su <strong>pronta respuesta</strong> y esperamos regularizar esta situación a la mayor brevedad posible.</p>
+
+        <div class="footer">
+            <p><strong>KAVE HOME</strong></p>
+            <p>Planning Department</p>
+            <p style="font-size: 0.9em; color: #999; margin-top: 15px;">
+                📧 Este es un email automático de reclamación<br>
+                Generado el {generado}
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+
+def resumen_reclamacion(pedidos_prov):
+    """Totales de la reclamación de un proveedor"""
+    return {
+        'pedidos': pedidos_prov['Nº documento'].nunique(),
+        'lineas': len(pedidos_prov),
+        'unidades': pedidos_prov['Cantidad Pendiente'].sum(),
+        'retraso': pedidos_prov['Días Retraso'].mean()
+    }
+
+def _reclamacion_html(modelo):
+    """Documento HTML completo de la reclamación a partir de su modelo"""
+    resumen = modelo['resumen']
+    filas = list(map(_LINEA_RECLAMACION.format, modelo['articulos'], modelo['descripciones'], modelo['unidades']))
+
+    return ''.join([
+        _CABECERA_RECLAMACION.format(estilos=_ESTILOS_RECLAMACION, **resumen),
+        _bloques_documento(_DOCUMENTO_RECLAMACION, modelo['documentos'], filas),
+        _PIE_RECLAMACION.format(generado=_generado_el(), **resumen)
+    ])
+
+_CABECERA_TEXTO_RECLAMACION = """RECLAMACIÓN - Pedidos Pendientes de Entrega
+
+Estimado proveedor,
+
+Los siguientes pedidos están PENDIENTES DE ENTREGA con retraso:
+
+"""
+
+_DOCUMENTO_TEXTO_RECLAMACION = """
+PEDIDO: {documento}
+Fecha esperada: {fecha} | Almacén: {almacen} | RETRASO: {dias} DÍAS
+""" + '─' * 70 + """
+{filas}  TOTAL: {unidades:.0f} unidades
+
+"""
+
+_PIE_TEXTO_RECLAMACION = """
+RESUMEN:
+- Pedidos: {pedidos}
+- Líneas: {lineas}
+- Unidades: {unidades:.0f}
+- Retraso promedio: {retraso:.0f} días
+
+SOLICITAMOS URGENTEMENTE:
+1. Confirmación de fechas de envío
+2. Números de tracking/albaranes
+3. Plan de acción para evitar futuros retrasos
+
+Saludos cordiales,
+KAVE HOME - Planning Department
+"""
+
+def _reclamacion_texto(modelo):
+    """Reclamación en texto plano a partir de su modelo"""
+    filas = list(map("  • {0} - {1}: {2} uds\n".format, modelo['articulos'], modelo['descripciones'], modelo['unidades']))
+
+    return ''.join([
+        _CABECERA_TEXTO_RECLAMACION,
+        _bloques_documento(_DOCUMENTO_TEXTO_RECLAMACION, modelo['documentos'], filas),
+        _PIE_TEXTO_RECLAMACION.format(**modelo['resumen'])
+    ])
+
+_CABECERA_MAILTO_RECLAMACION = """Estimado proveedor,
+
+Por medio de la presente, le informamos que los siguientes pedidos están PENDIENTES DE ENTREGA:
+
+RESUMEN:
+- Total pedidos: {pedidos}
+- Lineas afectadas: {lineas}
+- Unidades pendientes: {unidades:.0f}
+- Retraso promedio: {retraso:.0f} dias
+
+"""
+
+_DOCUMENTO_MAILTO_RECLAMACION = """
+================================================================================
+PEDIDO: {documento}
+Fecha esperada: {fecha}
+Almacen destino: {almacen}
+RETRASO: {dias} DIAS
+================================================================================
+
+{filas}TOTAL PEDIDO: {unidades:.0f} unidades ({lineas} lineas)
+
+"""
+
+_PIE_MAILTO_RECLAMACION = """
+================================================================================
+SOLICITAMOS URGENTEMENTE:
+================================================================================
+
+1. Confirmacion de FECHAS DE ENVIO para cada pedido
+2. Numeros de TRACKING/ALBARANES una vez enviados
+3. PLAN DE ACCION para evitar futuros retrasos
+
+Agradecemos su pronta respuesta.
+
+Atentamente,
+KAVE HOME - Planning Department
+"""
+
+def _reclamacion_mailto(modelo):
+    """Cuerpo de la reclamación para el enlace mailto a partir de su modelo"""
+    filas = list(map(
+        "  {0}. {1}\n     {2}\n     Cantidad pendiente: {3} unidades\n\n".format,
+        modelo['posiciones'], modelo['articulos'], modelo['descripciones'], modelo['unidades']
+    ))
+
+    return ''.join([
+        _CABECERA_MAILTO_RECLAMACION.format(**modelo['resumen']),
+        _bloques_documento(_DOCUMENTO_MAILTO_RECLAMACION, modelo['documentos'], filas),
+        _PIE_MAILTO_RECLAMACION
+    ])
+
+def generar_reclamacion(pedidos_prov):
+    """Todas las piezas de la reclamación de un proveedor: totales, HTML y cuerpos de texto.
+
+    El modelo (agrupación por documento y formateo de líneas) se calcula una vez para los tres formatos.
+    """
+    modelo = modelo_reclamacion(pedidos_prov)
+    return {
+        'resumen': modelo['resumen'],
+        'mailto': _reclamacion_mailto(modelo),
+        'html': _reclamacion_html(modelo),
+        'texto': _reclamacion_texto(modelo)
+    }
+
+def generar_reclamaciones(lotes):
+    """Genera las reclamaciones de varios proveedores, una a una y en el orden de `lotes`.
+
+    `lotes` son pares (proveedor, líneas). Devuelve un iterador de (proveedor, reclamación)
+    para ir pintándolas con una barra de progreso. El formateo es Python puro (retiene el
+    GIL), así que un pool de hilos no lo acelera y solo desordenaría el resultado.
+    """
+    for proveedor, pedidos in lotes:
+        yield proveedor, generar_reclamacion(pedidos)
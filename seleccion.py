@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Una línea se identifica por su documento y su artículo (la misma clave que el histórico)
+CLAVE_LINEA = ['Nº documento', 'Nº Artículo']
+
+# Líneas que se envían al navegador en cada página de la tabla de selección
+TAM_PAGINA = 50
+
+# Órdenes disponibles: etiqueta -> (columna, ascendente)
+ORDENES = {
+    'Días de retraso': ('Días Retraso', False),
+    'Fecha esperada': ('Fecha Esperada', True),
+    'Proveedor': ('Proveedor', True),
+    'Almacén': ('Almacén', True),
+    'Cantidad pendiente': ('Cantidad Pendiente', False)
+}
+ORDEN_POR_DEFECTO = 'Días de retraso'
+
+def _claves(df):
+    """Índice (Nº documento, Nº Artículo) de las líneas"""
+    return pd.MultiIndex.from_arrays([df[col] for col in CLAVE_LINEA])
+
+def mascara_seleccion(df, seleccion):
+    """Array booleano: qué líneas de df están en la selección (conjunto de claves)"""
+    if not seleccion or len(df) == 0:
+        return np.zeros(len(df), dtype=bool)
+    return _claves(df).isin(seleccion)
+
+def marcar(seleccion, df, seleccionar=True):
+    """Añade (o quita) de la selección todas las líneas de df, sin pasar por la tabla del navegador"""
+    claves = set(_claves(df).tolist())
+    if seleccionar:
+        seleccion |= claves
+    else:
+        seleccion -= claves
+    return seleccion
+
+def ordenar_lineas(df, orden=ORDEN_POR_DEFECTO):
+    """Líneas ordenadas por uno de los ORDENES (estable: a igualdad se mantiene el orden por fecha)"""
+    columna, ascendente = ORDENES[orden]
+    return df.sort_values(columna, ascending=ascendente, kind='stable')
+
+def num_paginas(total_lineas, tam_pagina=TAM_PAGINA):
+    """Páginas necesarias para mostrar todas las líneas (al menos una)"""
+    return max(1, math.ceil(total_lineas / tam_pagina))
+
+def pagina(df, numero, tam_pagina=TAM_PAGINA):
+    """Líneas de la página `numero` (empezando en 1) de un DataFrame ya ordenado"""
+    inicio = (numero - 1) * tam_pagina
+    return df.iloc[inicio:inicio + tam_pagina]
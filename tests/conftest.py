@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+import historico
+import proveedores
+from ingesta import normalizar_tipos
+from sinteticos import generar_pedidos
+
+@pytest.fixture(autouse=True)
+def bases_de_datos_temporales(tmp_path, monkeypatch):
+    """Cada prueba usa sus propias bases de datos: nunca se toca proveedores.db del repositorio"""
+    monkeypatch.setattr(proveedores, 'DB_PATH', str(tmp_path / 'proveedores.db'))
+    monkeypatch.setattr(historico, 'HISTORICO_DB_PATH', str(tmp_path / 'historico.db'))
+
+@pytest.fixture
+def pedidos():
+    """Exportación sintética normalizada con códigos de proveedor y fechas vacíos"""
+    df = normalizar_tipos(generar_pedidos(5_000, semilla=7))
+    rng = np.random.default_rng(7)
+    for col in ['Compra a-Nº proveedor', 'Fecha recepción esperada', 'Fecha recepción real', 'Fecha pedido']:
+        df.loc[rng.random(len(df)) < 0.02, col] = pd.NA if col == 'Compra a-Nº proveedor' else pd.NaT
+    return df
+
+@pytest.fixture
+def nombres(pedidos):
+    """Nombres de proveedor de los pedidos (uno de cada diez sin alta en el directorio)"""
+    codigos = sorted(int(codigo) for codigo in pedidos['Compra a-Nº proveedor'].dropna().unique())
+    return {codigo: f'PROVEEDOR SINTÉTICO {codigo} S.L.' for codigo in codigos if codigo % 10}
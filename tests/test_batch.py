@@ -0,0 +1,54 @@
+import os
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import batch
+from otif import calcular_metricas_proveedor, calcular_otif, filtrar_por_fechas, ordenar_por_fecha
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet'])
+def test_metricas_por_lotes_igual_que_en_memoria(pedidos, tmp_path, extension):
+    ruta = tmp_path / f'pedidos{extension}'
+    if extension == '.csv':
+        pedidos.to_csv(ruta, index=False)
+    else:
+        pedidos.to_parquet(ruta, index=False)
+    salida = tmp_path / 'salida'
+
+    codigo = batch.main([
+        str(ruta), '--salida', str(salida), '--desde', '2025-01-01', '--hasta', '2025-06-30',
+        '--formato', 'csv', '--sin-reportes'
+    ])
+
+    assert codigo == 0
+    df_otif = filtrar_por_fechas(ordenar_por_fecha(calcular_otif(pedidos)), date(2025, 1, 1), date(2025, 6, 30))
+    pd.testing.assert_frame_equal(
+        pd.read_csv(salida / 'metricas_proveedores.csv'),
+        calcular_metricas_proveedor(df_otif).astype({'Proveedor': object}),
+        check_dtype=False
+    )
+
+def test_archivo_sin_columnas(tmp_path, capsys):
+    ruta = tmp_path / 'pedidos.csv'
+    pd.DataFrame({'Nº documento': ['PC-1']}).to_csv(ruta, index=False)
+
+    assert batch.main([str(ruta), '--salida', str(tmp_path / 'salida')]) == 1
+    assert 'columnas necesarias' in capsys.readouterr().err
+
+def test_nombres_de_reporte_unicos():
+    nombres = batch.nombres_ficheros(['ACME S.L.', 'ACME/S.L.', 'acme s.l.', 'Beta'])
+
+    assert nombres == {'ACME S.L.': 'ACME_S.L.', 'ACME/S.L.': 'ACME_S.L._2', 'acme s.l.': 'acme_s.l._3', 'Beta': 'Beta'}
+
+def test_reportes_de_proveedores_que_chocan(pedidos, nombres, tmp_path):
+    # Dos proveedores distintos cuyo nombre limpio coincide
+    codigo_a, codigo_b = list(nombres)[:2]
+    nombres[codigo_a], nombres[codigo_b] = 'ACME S.L.', 'ACME/S.L.'
+    df_otif = calcular_otif(pedidos, nombres)
+    df_otif = df_otif[df_otif['Proveedor'].isin(['ACME S.L.', 'ACME/S.L.'])]
+
+    rutas = batch.generar_reportes(df_otif, tmp_path, procesos=1)
+
+    assert sorted(os.path.basename(ruta) for ruta in rutas) == ['reporte_otif_ACME_S.L..html', 'reporte_otif_ACME_S.L._2.html']
+    assert 'ACME/S.L.' in (tmp_path / 'reporte_otif_ACME_S.L._2.html').read_text(encoding='utf-8')
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pandas as pd
+
+from cache_resultados import CacheResultados
+from otif import calcular_otif
+
+def test_lru_respeta_el_presupuesto():
+    cache = CacheResultados(presupuesto_bytes=2_500)
+    for clave in 'abc':
+        cache.obtener(('etapa', clave), lambda: bytes(1_000))
+    cache.obtener(('etapa', 'b'), lambda: None)
+    cache.obtener(('etapa', 'd'), lambda: bytes(1_000))
+
+    # Se descarta la usada hace más tiempo ('a' y luego 'c'), nunca se supera el presupuesto
+    estadisticas = cache.estadisticas()
+    assert estadisticas['entradas'] == 2
+    assert estadisticas['mb'] * 1024 ** 2 <= 2_500
+    assert cache.obtener(('etapa', 'b'), lambda: 'recalculado') != 'recalculado'
+    assert cache.obtener(('etapa', 'a'), lambda: 'recalculado') == 'recalculado'
+
+def test_un_calculo_por_clave():
+    cache = CacheResultados(presupuesto_bytes=10 ** 6)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        time.sleep(0.2)
+        return 'resultado'
+
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(cache.obtener(('etapa', 'x'), calcular)))
+        for _ in range(5)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert resultados == ['resultado'] * 5
+    assert len(calculos) == 1
+
+def test_ida_y_vuelta_por_disco(pedidos, nombres, tmp_path):
+    df_otif = calcular_otif(pedidos, nombres)
+    clave = ('otif', 'huella', 1)
+    CacheResultados(10 ** 9, str(tmp_path)).obtener(clave, lambda: df_otif, disco=True)
+
+    # Otro proceso (caché vacía) lo lee de disco sin recalcular, con los mismos tipos compactos
+    def no_recalcular():
+        raise AssertionError("debería leerse de disco")
+
+    leido = CacheResultados(10 ** 9, str(tmp_path)).obtener(clave, no_recalcular, disco=True)
+    pd.testing.assert_frame_equal(leido, df_otif, check_categorical=False)
+    for col in df_otif.columns:
+        assert leido[col].dtype.name == df_otif[col].dtype.name
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pandas as pd
+
+from cubo import calcular_metricas_cubo, construir_cubo_otif, conteo_estados_cubo, filtrar_cubo, resumen_cubo
+from graficos import conteo_estados
+from otif import (
+    PROVEEDOR_DESCONOCIDO, calcular_metricas_proveedor, calcular_otif, es_otif, filtrar_por_fechas, ordenar_por_fecha,
+    lineas_proveedor, particionar_por_proveedor
+)
+
+def test_metricas_cubo_igual_que_por_lineas(pedidos, nombres):
+    df_otif = ordenar_por_fecha(calcular_otif(pedidos, nombres))
+    cubo = construir_cubo_otif(df_otif)
+
+    pd.testing.assert_frame_equal(
+        calcular_metricas_cubo(cubo).astype({'Proveedor': object}),
+        calcular_metricas_proveedor(df_otif).astype({'Proveedor': object}),
+        check_dtype=False
+    )
+
+def test_periodo_cubo_igual_que_por_lineas(pedidos, nombres):
+    df_otif = ordenar_por_fecha(calcular_otif(pedidos, nombres))
+    cubo = construir_cubo_otif(df_otif)
+    inicio, fin = date(2025, 3, 1), date(2025, 8, 31)
+
+    df_periodo = filtrar_por_fechas(df_otif, inicio, fin)
+    cubo_periodo = filtrar_cubo(cubo, inicio, fin)
+
+    total, lineas_otif, _, num_proveedores = resumen_cubo(cubo_periodo)
+    assert total == len(df_periodo)
+    assert lineas_otif == es_otif(df_periodo).sum()
+    assert num_proveedores == df_periodo['Proveedor'].nunique()
+    pd.testing.assert_frame_equal(
+        calcular_metricas_cubo(cubo_periodo).astype({'Proveedor': object}),
+        calcular_metricas_proveedor(df_periodo).astype({'Proveedor': object}),
+        check_dtype=False
+    )
+
+def test_conteo_estados_cubo_igual_que_por_lineas(pedidos, nombres):
+    df_otif = ordenar_por_fecha(calcular_otif(pedidos, nombres))
+    inicio, fin = date(2025, 1, 1), date(2025, 12, 31)
+    df_periodo = filtrar_por_fechas(df_otif, inicio, fin)
+    particion = particionar_por_proveedor(df_periodo)
+    proveedores = sorted(particion)[:20] + [PROVEEDOR_DESCONOCIDO, 'Proveedor sin líneas']
+
+    conteos = conteo_estados_cubo(filtrar_cubo(construir_cubo_otif(df_otif), inicio, fin), proveedores)
+
+    assert list(conteos) == proveedores
+    for proveedor in proveedores:
+        esperado = conteo_estados(lineas_proveedor(df_periodo, particion, proveedor))
+        # Mismos conteos, de mayor a menor (el orden entre empates puede variar)
+        assert dict(conteos[proveedor]) == dict(esperado)
+        lineas = [total for _, total in conteos[proveedor]]
+        assert lineas == sorted(lineas, reverse=True)
+    assert conteos['Proveedor sin líneas'] == ()
@@ -0,0 +1,142 @@
+import smtplib
+import socketserver
+import threading
+from datetime import date
+from email import message_from_bytes
+
+import pandas as pd
+import pytest
+
+import envio
+from envio import PoolSMTP, _es_temporal, enviar_reportes_proveedores
+from otif import calcular_otif, particionar_por_proveedor
+from proveedores import cargar_proveedores_desde_excel, obtener_nombres_proveedores
+
+class _SesionSMTP(socketserver.StreamRequestHandler):
+    """Una conexión con el servidor de pruebas: el mínimo de SMTP que usa smtplib, sin TLS ni login"""
+
+    def _responder(self, linea):
+        self.wfile.write(f"{linea}\r\n".encode('ascii'))
+
+    def handle(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.abiertas += 1
+            servidor.conexiones += 1
+            servidor.max_abiertas = max(servidor.max_abiertas, servidor.abiertas)
+        try:
+            self._responder("220 localhost SMTP de pruebas")
+            for linea in self.rfile:
+                comando = linea.decode('ascii').strip().upper()
+                if comando.startswith(('EHLO', 'HELO')):
+                    self._responder("250 localhost")
+                elif comando == 'DATA':
+                    self._responder("354 Fin con <CRLF>.<CRLF>")
+                    self._recibir()
+                elif comando == 'QUIT':
+                    self._responder("221 Adios")
+                    return
+                else:
+                    # MAIL, RCPT, RSET, NOOP
+                    self._responder("250 OK")
+        finally:
+            with servidor.lock:
+                servidor.abiertas -= 1
+
+    def _recibir(self):
+        """Lee el mensaje hasta la línea '.'; rechaza con 451 los destinatarios marcados una vez"""
+        lineas = []
+        for linea in self.rfile:
+            if linea == b'.\r\n':
+                break
+            lineas.append(linea[1:] if linea.startswith(b'..') else linea)
+        mensaje = message_from_bytes(b''.join(lineas))
+
+        servidor = self.server
+        with servidor.lock:
+            if mensaje['To'] in servidor.rechazar_una_vez:
+                servidor.rechazar_una_vez.discard(mensaje['To'])
+                servidor.rechazados.append(mensaje['To'])
+                self._responder("451 Intentelo mas tarde")
+                return
+            servidor.recibidos.append(mensaje)
+        self._responder("250 Aceptado")
+
+class _ServidorSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SesionSMTP)
+        self.lock = threading.Lock()
+        self.abiertas = 0
+        self.max_abiertas = 0
+        self.conexiones = 0
+        self.recibidos = []
+        self.rechazados = []
+        self.rechazar_una_vez = set()
+
+@pytest.fixture
+def servidor_smtp():
+    """Servidor SMTP local que guarda los mensajes recibidos"""
+    servidor = _ServidorSMTP()
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+@pytest.fixture
+def sin_esperas(monkeypatch):
+    """Los reintentos no esperan de verdad; se anotan las esperas pedidas"""
+    esperas = []
+    monkeypatch.setattr(envio.time, 'sleep', esperas.append)
+    return esperas
+
+def test_un_mensaje_por_proveedor_con_reintento(pedidos, servidor_smtp, sin_esperas):
+    codigos = sorted(int(codigo) for codigo in pedidos['Compra a-Nº proveedor'].dropna().unique())[:8]
+    # El último proveedor no tiene email
+    cargar_proveedores_desde_excel(pd.DataFrame({
+        'Nº': codigos,
+        'Nombre': [f'PROVEEDOR {codigo}' for codigo in codigos],
+        'Correo electrónico': [f'compras{codigo}@ejemplo.com' for codigo in codigos[:-1]] + [None]
+    }))
+    df_otif = calcular_otif(pedidos, obtener_nombres_proveedores())
+    particion = particionar_por_proveedor(df_otif)
+    proveedores = [f'PROVEEDOR {codigo}' for codigo in codigos]
+    servidor_smtp.rechazar_una_vez.add(f'compras{codigos[0]}@ejemplo.com')
+
+    with PoolSMTP('127.0.0.1', servidor_smtp.server_address[1], tamano=2) as pool:
+        resultados = enviar_reportes_proveedores(
+            df_otif, particion, pool, 'otif@ejemplo.com', date(2024, 1, 1), date(2026, 1, 31),
+            proveedores=proveedores
+        )
+
+    errores = {proveedor: error for proveedor, _, error in resultados}
+    assert errores == {**{proveedor: None for proveedor in proveedores[:-1]}, proveedores[-1]: 'Sin email registrado'}
+
+    # Un mensaje por proveedor con email, incluido el que se reintentó tras el 451
+    destinatarios = sorted(mensaje['To'] for mensaje in servidor_smtp.recibidos)
+    assert destinatarios == sorted(f'compras{codigo}@ejemplo.com' for codigo in codigos[:-1])
+    assert servidor_smtp.rechazados == [f'compras{codigos[0]}@ejemplo.com']
+    assert sin_esperas == [envio.ESPERA_REINTENTO]
+
+    # Nunca más conexiones que el tamaño del pool, y se reutilizan entre envíos
+    assert servidor_smtp.max_abiertas <= 2
+    assert servidor_smtp.conexiones < len(destinatarios)
+
+@pytest.mark.parametrize('error, temporal', [
+    (smtplib.SMTPServerDisconnected('cortada'), True),
+    (smtplib.SMTPConnectError(421, b'ocupado'), True),
+    (smtplib.SMTPDataError(451, b'reintentar'), True),
+    (smtplib.SMTPDataError(554, b'rechazado'), False),
+    (smtplib.SMTPSenderRefused(550, b'remitente', 'otif@ejemplo.com'), False),
+    (smtplib.SMTPRecipientsRefused({'a@ejemplo.com': (450, b'buzon ocupado')}), True),
+    (smtplib.SMTPRecipientsRefused({'a@ejemplo.com': (550, b'no existe')}), False),
+    (smtplib.SMTPNotSupportedError('sin SMTPUTF8'), False),
+    (smtplib.SMTPException('otro error SMTP'), False),
+    (ConnectionResetError(), True),
+    (TimeoutError(), True),
+])
+def test_errores_temporales(error, temporal):
+    assert _es_temporal(error) is temporal
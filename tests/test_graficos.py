@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+import pytest
+
+import graficos
+from graficos import huella_imagen, imagen_estados, precalcular_imagenes
+
+CONTEOS = (('OTIF', 50), ('NO ENTREGADO', 20), ('ENTREGADO TARDE', 10))
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    """Cada prueba empieza con la caché de imágenes vacía"""
+    monkeypatch.setattr(graficos, '_imagenes', OrderedDict())
+
+def test_el_titulo_forma_parte_de_la_imagen():
+    con_titulo = imagen_estados(CONTEOS, 'PROVEEDOR UNO')
+
+    assert con_titulo is imagen_estados(CONTEOS, 'PROVEEDOR UNO')
+    assert con_titulo != imagen_estados(CONTEOS, 'PROVEEDOR DOS')
+    assert con_titulo != imagen_estados(CONTEOS)
+    assert con_titulo.startswith(b'\x89PNG')
+
+def test_se_descarta_la_usada_hace_mas_tiempo(monkeypatch):
+    monkeypatch.setattr(graficos, 'MAX_IMAGENES', 2)
+    imagen_estados(CONTEOS, 'A')
+    imagen_estados(CONTEOS, 'B')
+    imagen_estados(CONTEOS, 'A')
+
+    imagen_estados(CONTEOS, 'C')
+
+    assert list(graficos._imagenes) == [huella_imagen(CONTEOS, 'A'), huella_imagen(CONTEOS, 'C')]
+
+def test_precalcular_en_paralelo(monkeypatch):
+    monkeypatch.setattr(graficos, 'MIN_IMAGENES_PARALELO', 2)
+    graficos_proveedores = [(CONTEOS, f'PROVEEDOR {i}') for i in range(3)] + [(CONTEOS, 'PROVEEDOR 0')]
+
+    precalcular_imagenes(graficos_proveedores, procesos=2)
+
+    assert len(graficos._imagenes) == 3
+    # Las imágenes de los procesos son las mismas que se dibujarían en este
+    renderizada = graficos._renderizar_png(CONTEOS, 'PROVEEDOR 1')
+    assert imagen_estados(CONTEOS, 'PROVEEDOR 1') == renderizada
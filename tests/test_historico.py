@@ -0,0 +1,77 @@
+import sqlite3
+from datetime import date
+
+import pandas as pd
+
+import historico
+from historico import registrar_lineas, resumen_historico
+from otif import calcular_otif, es_otif
+
+def _lineas_bd():
+    """Filas guardadas en la tabla de hechos"""
+    with sqlite3.connect(historico.HISTORICO_DB_PATH) as conn:
+        return pd.read_sql_query('SELECT * FROM lineas_otif', conn)
+
+def _unicas(df_otif):
+    """Líneas con clave completa y sin repetir, como las guarda el histórico"""
+    df = df_otif.dropna(subset=['Nº documento', 'Nº Artículo'])
+    return df.drop_duplicates(['Nº documento', 'Nº Artículo'], keep='last')
+
+def test_primera_carga_y_recarga_sin_cambios(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+    unicas = _unicas(df_otif)
+
+    assert registrar_lineas(df_otif) == {'nuevas': len(unicas), 'actualizadas': 0, 'sin_cambios': 0}
+    assert len(_lineas_bd()) == len(unicas)
+
+    # Marca fija: CURRENT_TIMESTAMP va por segundos y no delataría una reescritura inmediata
+    with sqlite3.connect(historico.HISTORICO_DB_PATH) as conn:
+        conn.execute("UPDATE lineas_otif SET fecha_actualizacion = '2000-01-01 00:00:00'")
+    antes = _lineas_bd()
+    assert registrar_lineas(df_otif) == {'nuevas': 0, 'actualizadas': 0, 'sin_cambios': len(unicas)}
+    # Ni una fila reescrita: fecha_actualizacion intacta
+    pd.testing.assert_frame_equal(_lineas_bd(), antes)
+
+def test_cambio_de_estado(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+    registrar_lineas(df_otif)
+
+    # Una línea pendiente que llega: pasa a OTIF
+    cambiada = df_otif.copy()
+    posicion = int((cambiada['Estado'] == 'NO ENTREGADO').to_numpy().argmax())
+    cambiada.loc[posicion, 'Estado'] = 'OTIF'
+    documento, articulo = cambiada.loc[posicion, ['Nº documento', 'Nº Artículo']]
+
+    resumen = registrar_lineas(cambiada)
+
+    assert resumen == {'nuevas': 0, 'actualizadas': 1, 'sin_cambios': len(_unicas(df_otif)) - 1}
+    fila = _lineas_bd().set_index(['documento', 'articulo']).loc[(documento, articulo)]
+    assert fila['estado'] == 'OTIF' and fila['es_otif'] == 1
+
+def test_clave_repetida_gana_la_ultima(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres).iloc[:2].copy()
+    # Misma clave en las dos filas: la exportación repite la línea con otra cantidad
+    for col in ['Nº documento', 'Nº Artículo']:
+        df_otif[col] = df_otif[col].astype(object)
+        df_otif.loc[1, col] = df_otif.loc[0, col]
+    df_otif.loc[0, 'Cantidad Total'] = 11
+    df_otif.loc[1, 'Cantidad Total'] = 22
+
+    assert registrar_lineas(df_otif) == {'nuevas': 1, 'actualizadas': 0, 'sin_cambios': 0}
+    assert _lineas_bd()['cantidad_total'].tolist() == [22]
+
+def test_resumen_del_periodo(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+    registrar_lineas(df_otif)
+    inicio, fin = date(2025, 3, 1), date(2025, 3, 31)
+
+    unicas = _unicas(df_otif)
+    dias = unicas['Fecha Esperada'].dt.date
+    periodo = unicas[(dias >= inicio) & (dias <= fin)]
+
+    total, otif, otif_pct = resumen_historico(inicio, fin)
+
+    assert total == len(periodo) > 0
+    assert otif == es_otif(periodo).sum()
+    assert otif_pct == otif / total * 100
+    assert resumen_historico(date(1990, 1, 1), date(1990, 12, 31)) == (0, 0, 0)
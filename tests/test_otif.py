@@ -0,0 +1,154 @@
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import otif
+from ingesta import COLUMNAS_FECHA
+from otif import (
+    ESTADOS_OTIF, PROVEEDOR_DESCONOCIDO, calcular_metricas_proveedor, calcular_otif, calcular_otif_paralelo, calcular_otif_por_lotes,
+    cantidad_entregada, es_otif
+)
+
+def _estado_linea(esperada, real, pendiente):
+    """Reglas del diagrama de flujo línea a línea, como referencia de la versión vectorizada"""
+    if pd.isna(real):
+        return 'SIN FECHA REAL (COMPLETO)' if pendiente == 0 else 'NO ENTREGADO'
+    if pendiente != 0:
+        return 'NO ENTREGADO'
+    dias = 0 if pd.isna(esperada) else (real - esperada).days
+    if dias == 0:
+        return 'OTIF'
+    if 0 < dias <= 2:
+        return 'EXCEPCIÓN (2 DÍAS TARDE)'
+    return 'ENTREGADO TARDE' if dias > 2 else 'ENTREGADO ANTES'
+
+def test_proveedor_sin_codigo(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+    sin_codigo = pedidos['Compra a-Nº proveedor'].isna().to_numpy()
+    assert sin_codigo.any()
+
+    # Las líneas sin código no se atribuyen a ningún proveedor real
+    assert (df_otif['Proveedor'][sin_codigo] == PROVEEDOR_DESCONOCIDO).all()
+    assert not (df_otif['Proveedor'][~sin_codigo] == PROVEEDOR_DESCONOCIDO).any()
+
+    metricas = calcular_metricas_proveedor(df_otif).set_index('Proveedor')
+    assert metricas.loc[PROVEEDOR_DESCONOCIDO, 'Total Pedidos'] == sin_codigo.sum()
+    assert metricas['Total Pedidos'].sum() == len(pedidos)
+
+def test_nombres_de_proveedor(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+    codigos = pedidos['Compra a-Nº proveedor']
+    esperado = [
+        PROVEEDOR_DESCONOCIDO if pd.isna(codigo) else nombres.get(int(codigo), f"Proveedor {codigo}")
+        for codigo in codigos
+    ]
+    assert df_otif['Proveedor'].astype(object).tolist() == esperado
+
+def test_tipos_compactos_sin_perdida(pedidos, nombres):
+    df_otif = calcular_otif(pedidos, nombres)
+
+    # Texto: categóricas con los mismos valores
+    for col_otif, col_pedidos in [('Nº Artículo', 'Nº'), ('Descripción', 'Descripción'), ('Almacén', 'Cód. almacén')]:
+        assert isinstance(df_otif[col_otif].dtype, pd.CategoricalDtype)
+        assert df_otif[col_otif].astype(object).tolist() == pedidos[col_pedidos].astype(object).tolist()
+
+    # Cantidades y costes: mismos valores que en float64 (el coste con decimales no se compacta)
+    for col_otif, col_pedidos in [
+        ('Cantidad Total', 'Cantidad (base)'), ('Cantidad Pendiente', 'Cdad. pendiente (base)'),
+        ('Coste Unitario', 'Coste unit. directo excl. IVA')
+    ]:
+        np.testing.assert_array_equal(df_otif[col_otif].astype('float64'), pedidos[col_pedidos])
+    assert df_otif['Coste Unitario'].dtype == np.float64
+
+    # Columnas derivadas: se calculan igual que cuando se guardaban por línea
+    np.testing.assert_array_equal(
+        cantidad_entregada(df_otif).astype('float64'),
+        pedidos['Cantidad (base)'] - pedidos['Cdad. pendiente (base)']
+    )
+    estados = [
+        _estado_linea(esperada, real, pendiente)
+        for esperada, real, pendiente in zip(
+            pedidos['Fecha recepción esperada'], pedidos['Fecha recepción real'], pedidos['Cdad. pendiente (base)']
+        )
+    ]
+    assert df_otif['Estado'].astype(object).tolist() == estados
+    assert es_otif(df_otif).tolist() == [estado in ESTADOS_OTIF for estado in estados]
+
+    dias = (pedidos['Fecha recepción real'] - pedidos['Fecha recepción esperada']).dt.days.fillna(0)
+    np.testing.assert_array_equal(df_otif['Días Diferencia'].astype('int64'), dias.astype('int64'))
+
+def _valores(df_otif):
+    """df_otif con tipos amplios (object/datetime64[ns]/float64/int64) para comparar resultados de distintas rutas"""
+    df = df_otif.reset_index(drop=True).copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype('datetime64[ns]')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float64')
+        elif pd.api.types.is_integer_dtype(df[col]) and col != 'Código Proveedor':
+            df[col] = df[col].astype('int64')
+    return df
+
+@pytest.mark.parametrize('extension', ['.parquet', '.csv'])
+def test_por_lotes_igual_que_en_memoria(pedidos, nombres, tmp_path, extension):
+    ruta = tmp_path / f'pedidos{extension}'
+    if extension == '.csv':
+        pedidos.to_csv(ruta, index=False)
+    else:
+        pedidos.to_parquet(ruta, index=False)
+    destino = tmp_path / 'otif.parquet'
+
+    total = calcular_otif_por_lotes(str(ruta), str(destino), tam_lote=700, nombres=nombres)
+
+    assert total == len(pedidos)
+    pd.testing.assert_frame_equal(
+        _valores(pd.read_parquet(destino)), _valores(calcular_otif(pedidos, nombres)), check_dtype=False
+    )
+
+@pytest.fixture
+def sin_pool(monkeypatch):
+    """Cálculo paralelo desde cero incluso con pocas líneas; al terminar se cierra el pool"""
+    monkeypatch.setattr(otif, 'MIN_FILAS_PARALELO', 0)
+    yield
+    otif._descartar_pool()
+
+@pytest.mark.parametrize('fechas_como_texto', [False, True])
+def test_paralelo_igual_que_en_serie(pedidos, nombres, sin_pool, fechas_como_texto):
+    if fechas_como_texto:
+        # Fechas sin tipar: también se convierten en los procesos
+        pedidos = pedidos.copy()
+        for col in COLUMNAS_FECHA:
+            pedidos[col] = pedidos[col].dt.strftime('%Y-%m-%d').astype(object).where(pedidos[col].notna(), None)
+
+    paralelo = calcular_otif_paralelo(pedidos, procesos=3, nombres=nombres)
+
+    pd.testing.assert_frame_equal(_valores(paralelo), _valores(calcular_otif(pedidos, nombres)))
+
+class _PoolRoto:
+    """Pool cuyo proceso ha muerto: todo envío falla como en un ProcessPoolExecutor roto"""
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("un proceso terminó de forma abrupta")
+
+    def map(self, *args, **kwargs):
+        raise BrokenProcessPool("un proceso terminó de forma abrupta")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+def test_paralelo_se_recupera_de_un_pool_roto(pedidos, nombres, sin_pool, monkeypatch):
+    monkeypatch.setattr(otif, '_pool', _PoolRoto())
+    monkeypatch.setattr(otif, '_pool_procesos', 2)
+    esperado = _valores(calcular_otif(pedidos, nombres))
+
+    # Con el pool roto se calcula en serie y se descarta el pool
+    pd.testing.assert_frame_equal(_valores(calcular_otif_paralelo(pedidos, procesos=2, nombres=nombres)), esperado)
+    assert otif._pool is None
+
+    # El siguiente cálculo arranca un pool nuevo
+    pd.testing.assert_frame_equal(_valores(calcular_otif_paralelo(pedidos, procesos=2, nombres=nombres)), esperado)
+    assert otif._pool is not None
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pandas as pd
+
+import proveedores
+from proveedores import cargar_proveedores_desde_excel, obtener_nombres_proveedores
+
+def test_no_cambia_el_modo_de_diario():
+    # proveedores.db está en el repositorio: abrirla no debe reescribir su cabecera
+    cargar_proveedores_desde_excel(pd.DataFrame({'Nº': [1], 'Nombre': ['UNO S.L.']}))
+    assert obtener_nombres_proveedores() == {1: 'UNO S.L.'}
+
+    modo, = sqlite3.connect(proveedores.DB_PATH).execute('PRAGMA journal_mode').fetchone()
+    assert modo == 'delete'
+
+def _excel(emails=('uno@ejemplo.com', 'dos@ejemplo.com', None)):
+    """Excel de proveedores como lo sube el usuario (el tercero sin alias ni email)"""
+    return pd.DataFrame({
+        'Nº': [1, 2, 3],
+        'Nombre': ['UNO S.L.', 'DOS S.A.', 'TRES S.L.'],
+        'Alias': ['UNO', None, None],
+        'Correo electrónico': list(emails)
+    })
+
+def test_carga_incremental_sin_cambios():
+    cargar_proveedores_desde_excel(_excel())
+
+    resumen = cargar_proveedores_desde_excel(_excel(), incremental=True)
+
+    assert resumen == {'insertados': 0, 'actualizados': 0, 'sin_cambios': 3, 'eliminados': 0}
+
+def test_carga_incremental_actualiza_el_directorio():
+    cargar_proveedores_desde_excel(_excel())
+    assert proveedores.obtener_email_proveedor(2) == 'dos@ejemplo.com'
+
+    resumen = cargar_proveedores_desde_excel(
+        pd.concat([_excel(('uno@ejemplo.com', 'compras@dos.com', None)), pd.DataFrame({'Nº': [4], 'Nombre': ['CUATRO']})]),
+        incremental=True
+    )
+
+    assert resumen == {'insertados': 1, 'actualizados': 1, 'sin_cambios': 2, 'eliminados': 0}
+    # El mapa en memoria se invalida: la consulta ve el email nuevo sin reiniciar
+    assert proveedores.obtener_email_proveedor(2) == 'compras@dos.com'
+    assert obtener_nombres_proveedores() == {1: 'UNO', 2: 'DOS S.A.', 3: 'TRES S.L.', 4: 'CUATRO'}
+
+def test_nulos_y_vacios_no_son_cambios():
+    # Filas guardadas con NULL (p. ej. de una versión anterior) frente a un Excel con celdas vacías
+    conn = proveedores.directorio().conexion()
+    with conn:
+        conn.execute("INSERT INTO proveedores (codigo, nombre) VALUES (3, 'TRES S.L.')")
+    proveedores.directorio().invalidar()
+
+    resumen = cargar_proveedores_desde_excel(_excel().iloc[[2]], incremental=True)
+    assert resumen['sin_cambios'] == 1 and resumen['actualizados'] == 0
+
+    excel_vacios = _excel().iloc[[2]].fillna('')
+    resumen = cargar_proveedores_desde_excel(excel_vacios, incremental=True)
+    assert resumen['sin_cambios'] == 1 and resumen['actualizados'] == 0
+
+def test_carga_completa_reemplaza_la_tabla():
+    cargar_proveedores_desde_excel(_excel())
+
+    resumen = cargar_proveedores_desde_excel(pd.DataFrame({'Nº': [9], 'Nombre': ['NUEVE']}))
+
+    assert resumen == {'insertados': 1, 'actualizados': 0, 'sin_cambios': 0, 'eliminados': 3}
+    assert obtener_nombres_proveedores() == {9: 'NUEVE'}
+    assert proveedores.contar_proveedores() == 1
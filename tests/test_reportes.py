@@ -0,0 +1,237 @@
+import re
+from datetime import date
+
+import pandas as pd
+
+from otif import calcular_metricas_proveedor, calcular_otif, lineas_proveedor, particionar_por_proveedor
+from reportes import (
+    generar_reclamacion, generar_reclamaciones, generar_reporte_proveedor_html, generar_reporte_proveedor_texto,
+    metricas_reporte, modelo_reclamacion
+)
+
+NOMBRE_RARO = 'ACME {S.L.} <Norte> & Cía {0}'
+
+def _proveedor_raro(pedidos, nombres):
+    """df_otif donde el proveedor con más líneas tiene llaves y '<' en el nombre y en descripciones"""
+    codigo = int(pedidos['Compra a-Nº proveedor'].value_counts().index[0])
+    pedidos = pedidos.copy()
+    lineas = (pedidos['Compra a-Nº proveedor'] == codigo).fillna(False).to_numpy()
+    pedidos.loc[lineas, 'Descripción'] = 'Mesa {ancho} <roble>'
+    df_otif = calcular_otif(pedidos, {**nombres, codigo: NOMBRE_RARO})
+    return df_otif, lineas_proveedor(df_otif, particionar_por_proveedor(df_otif), NOMBRE_RARO)
+
+def test_reporte_html(pedidos, nombres):
+    df_otif, df_proveedor = _proveedor_raro(pedidos, nombres)
+    metricas = metricas_reporte(df_proveedor)
+
+    html = generar_reporte_proveedor_html(NOMBRE_RARO, df_proveedor, metricas, 'IMAGEN')
+
+    # Los valores se insertan tal cual: las llaves no se interpretan como campos de la plantilla
+    assert f'<h2>{NOMBRE_RARO}</h2>' in html
+    assert 'Mesa {ancho} <roble>' in html
+    assert 'data:image/png;base64,IMAGEN' in html
+
+    # KPIs de cabecera iguales a las métricas por proveedor del dashboard
+    fila = calcular_metricas_proveedor(df_otif).set_index('Proveedor').loc[NOMBRE_RARO]
+    assert metricas['total'] == fila['Total Pedidos']
+    assert metricas['otif_count'] == fila['OTIF Count']
+    valores = re.findall(r'<div class="metric-value">([^<]*)</div>', html)
+    no_entregados = (df_proveedor['Estado'] == 'NO ENTREGADO').sum()
+    assert valores[:3] == [str(int(fila['Total Pedidos'])), f"{fila['% OTIF']:.1f}%", str(no_entregados)]
+
+    # Una fila por línea no entregada
+    assert html.count('</tr>') >= no_entregados
+
+def test_reporte_texto(pedidos, nombres):
+    df_otif, df_proveedor = _proveedor_raro(pedidos, nombres)
+    metricas = metricas_reporte(df_proveedor)
+
+    texto = generar_reporte_proveedor_texto(df_proveedor, metricas, date(2024, 1, 1), date(2026, 1, 31))
+
+    fila = calcular_metricas_proveedor(df_otif).set_index('Proveedor').loc[NOMBRE_RARO]
+    assert 'Adjunto encontrará el reporte OTIF del período 01/01/2024 - 31/01/2026.' in texto
+    assert f"• Total de pedidos: {int(fila['Total Pedidos'])}\n" in texto
+    assert f"• % OTIF: {fila['% OTIF']:.1f}%\n" in texto
+    assert f"• Pedidos OTIF: {int(fila['OTIF Count'])}\n" in texto
+    assert 'Mesa {ancho} <roble>' in texto
+
+# Líneas pendientes de un proveedor desordenadas por documento, con una sin documento
+LINEAS_RECLAMACION = pd.DataFrame({
+    'Nº documento': ['PC-3', 'PC-1', 'PC-3', None, 'PC-2', 'PC-1'],
+    'Nº Artículo': ['A-30', 'A-10', 'A-31', 'A-99', 'A-20', 'A-11'],
+    'Descripción': ['Silla {alta}', 'Mesa <roble>', 'Silla baja', 'Perdida', 'Lámpara', 'Mesa pino'],
+    'Almacén': ['02', '01', '02', '01', '03', '01'],
+    'Fecha Esperada': pd.to_datetime(['2025-03-10', '2025-03-01', '2025-03-10', '2025-03-05', None, '2025-03-01']),
+    'Cantidad Pendiente': [4.0, 10.0, 1.5, 7.0, 3.0, 2.0],
+    'Días Retraso': [5, 14, 5, 9, 0, 14]
+})
+
+# Salidas de la versión anterior (un agrupado por formato) para LINEAS_RECLAMACION
+TEXTO_RECLAMACION = """RECLAMACIÓN - Pedidos Pendientes de Entrega
+
+Estimado proveedor,
+
+Los siguientes pedidos están PENDIENTES DE ENTREGA con retraso:
+
+
+PEDIDO: PC-1
+Fecha esperada: 01/03/2025 | Almacén: 01 | RETRASO: 14 DÍAS
+──────────────────────────────────────────────────────────────────────
+  • A-10 - Mesa <roble>: 10 uds
+  • A-11 - Mesa pino: 2 uds
+  TOTAL: 12 unidades
+
+
+PEDIDO: PC-2
+Fecha esperada: N/A | Almacén: 03 | RETRASO: 0 DÍAS
+──────────────────────────────────────────────────────────────────────
+  • A-20 - Lámpara: 3 uds
+  TOTAL: 3 unidades
+
+
+PEDIDO: PC-3
+Fecha esperada: 10/03/2025 | Almacén: 02 | RETRASO: 5 DÍAS
+──────────────────────────────────────────────────────────────────────
+  • A-30 - Silla {alta}: 4 uds
+  • A-31 - Silla baja: 2 uds
+  TOTAL: 6 unidades
+
+
+RESUMEN:
+- Pedidos: 3
+- Líneas: 6
+- Unidades: 28
+- Retraso promedio: 8 días
+
+SOLICITAMOS URGENTEMENTE:
+1. Confirmación de fechas de envío
+2. Números de tracking/albaranes
+3. Plan de acción para evitar futuros retrasos
+
+Saludos cordiales,
+KAVE HOME - Planning Department
+"""
+
+MAILTO_RECLAMACION = """Estimado proveedor,
+
+Por medio de la presente, le informamos que los siguientes pedidos están PENDIENTES DE ENTREGA:
+
+RESUMEN:
+- Total pedidos: 3
+- Lineas afectadas: 6
+- Unidades pendientes: 28
+- Retraso promedio: 8 dias
+
+
+================================================================================
+PEDIDO: PC-1
+Fecha esperada: 01/03/2025
+Almacen destino: 01
+RETRASO: 14 DIAS
+================================================================================
+
+  1. A-10
+     Mesa <roble>
+     Cantidad pendiente: 10 unidades
+
+  2. A-11
+     Mesa pino
+     Cantidad pendiente: 2 unidades
+
+TOTAL PEDIDO: 12 unidades (2 lineas)
+
+
+================================================================================
+PEDIDO: PC-2
+Fecha esperada: N/A
+Almacen destino: 03
+RETRASO: 0 DIAS
+================================================================================
+
+  1. A-20
+     Lámpara
+     Cantidad pendiente: 3 unidades
+
+TOTAL PEDIDO: 3 unidades (1 lineas)
+
+
+================================================================================
+PEDIDO: PC-3
+Fecha esperada: 10/03/2025
+Almacen destino: 02
+RETRASO: 5 DIAS
+================================================================================
+
+  1. A-30
+     Silla {alta}
+     Cantidad pendiente: 4 unidades
+
+  2. A-31
+     Silla baja
+     Cantidad pendiente: 2 unidades
+
+TOTAL PEDIDO: 6 unidades (2 lineas)
+
+
+================================================================================
+SOLICITAMOS URGENTEMENTE:
+================================================================================
+
+1. Confirmacion de FECHAS DE ENVIO para cada pedido
+2. Numeros de TRACKING/ALBARANES una vez enviados
+3. PLAN DE ACCION para evitar futuros retrasos
+
+Agradecemos su pronta respuesta.
+
+Atentamente,
+KAVE HOME - Planning Department
+"""
+
+def test_modelo_reclamacion_por_documento():
+    modelo = modelo_reclamacion(LINEAS_RECLAMACION)
+
+    # Documentos ordenados, la línea sin documento fuera y los datos de cabecera de su primera línea
+    assert modelo['documentos'] == {
+        'Nº documento': ['PC-1', 'PC-2', 'PC-3'],
+        'Fecha Esperada': ['01/03/2025', 'N/A', '10/03/2025'],
+        'Almacén': ['01', '03', '02'],
+        'Días Retraso': [14, 0, 5],
+        'Líneas': [2, 1, 2],
+        'Unidades': [12.0, 3.0, 5.5],
+        'Inicio': [0, 2, 3],
+        'Fin': [2, 3, 5]
+    }
+    # Dentro de cada documento las líneas conservan su orden de llegada
+    assert modelo['articulos'] == ['A-10', 'A-11', 'A-20', 'A-30', 'A-31']
+    assert modelo['posiciones'] == [1, 2, 1, 1, 2]
+    # El resumen cuenta todas las líneas del proveedor, también la que no tiene documento
+    assert modelo['resumen']['pedidos'] == 3
+    assert modelo['resumen']['lineas'] == 6
+    assert modelo['resumen']['unidades'] == 27.5
+    assert modelo['resumen']['retraso'] == sum(LINEAS_RECLAMACION['Días Retraso']) / 6
+
+def test_reclamacion_igual_que_la_version_anterior():
+    reclamacion = generar_reclamacion(LINEAS_RECLAMACION)
+
+    assert reclamacion['texto'] == TEXTO_RECLAMACION
+
+    assert reclamacion['mailto'] == MAILTO_RECLAMACION
+
+    # HTML: un bloque por documento en orden, con sus filas y su total, y los valores tal cual
+    html = reclamacion['html']
+    cabeceras = re.findall(r'📋 Pedido: (\S+) \|\s+📅 Fecha esperada: (\S+) \|\s+🏭 Almacén: (\S+) \|\s+⚠️ RETRASO: (\d+) DÍAS', html)
+    assert cabeceras == [('PC-1', '01/03/2025', '01', '14'), ('PC-2', 'N/A', '03', '0'), ('PC-3', '10/03/2025', '02', '5')]
+    assert re.findall(r'<td><strong>([^<]+)</strong></td>\s+<td>(.*?)</td>', html) == [
+        ('A-10', 'Mesa <roble>'), ('A-11', 'Mesa pino'), ('A-20', 'Lámpara'), ('A-30', 'Silla {alta}'), ('A-31', 'Silla baja')
+    ]
+    assert re.findall(r'(\d+) uds \((\d+) líneas\)', html) == [('12', '2'), ('3', '1'), ('6', '2')]
+    assert '<li><strong>Unidades pendientes:</strong> 28</li>' in html
+    assert '<li><strong>Retraso promedio:</strong> 8 días</li>' in html
+
+def test_reclamaciones_en_el_orden_de_los_lotes():
+    lotes = [(proveedor, LINEAS_RECLAMACION.iloc[:n]) for proveedor, n in [('ZETA', 6), ('ALFA', 2), ('MEDIO', 4)]]
+
+    resultado = list(generar_reclamaciones(lotes))
+
+    assert [proveedor for proveedor, _ in resultado] == ['ZETA', 'ALFA', 'MEDIO']
+    assert [reclamacion['resumen']['lineas'] for _, reclamacion in resultado] == [6, 2, 4]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from seleccion import TAM_PAGINA, marcar, mascara_seleccion, num_paginas, ordenar_lineas, pagina
+
+def _lineas(n=2 * TAM_PAGINA + 7):
+    """Líneas pendientes con claves únicas y retrasos repetidos"""
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        'Nº documento': [f'PC-{i // 3:04d}' for i in range(n)],
+        'Nº Artículo': [f'ART-{i % 3}' for i in range(n)],
+        'Proveedor': rng.choice(['ACME', 'BETA', 'GAMMA'], n),
+        'Almacén': rng.choice(['01', '02'], n),
+        'Fecha Esperada': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'Cantidad Pendiente': rng.integers(1, 50, n).astype(float),
+        'Días Retraso': rng.integers(0, 20, n)
+    })
+
+def _editar(seleccion, df_pagina, marcadas):
+    """Lo que hace la aplicación con los clics de una página de la tabla"""
+    antes = mascara_seleccion(df_pagina, seleccion)
+    cambiadas = marcadas != antes
+    marcar(seleccion, df_pagina[cambiadas & marcadas], True)
+    marcar(seleccion, df_pagina[cambiadas & ~marcadas], False)
+
+def test_seleccion_sobrevive_a_reordenar_y_cambiar_de_pagina():
+    df = _lineas()
+    seleccion = set()
+    primera = pagina(ordenar_lineas(df, 'Días de retraso'), 1)
+    _editar(seleccion, primera, np.arange(len(primera)) % 2 == 0)
+    elegidas = set(zip(primera['Nº documento'][::2], primera['Nº Artículo'][::2]))
+    assert seleccion == elegidas
+
+    # Otro orden y otra página: las marcas siguen en las mismas líneas, vengan donde vengan
+    reordenado = ordenar_lineas(df, 'Proveedor')
+    marcas = [
+        set(zip(p['Nº documento'][m], p['Nº Artículo'][m]))
+        for numero in range(1, num_paginas(len(reordenado)) + 1)
+        for p in [pagina(reordenado, numero)]
+        for m in [mascara_seleccion(p, seleccion)]
+    ]
+    assert set().union(*marcas) == elegidas
+    assert mascara_seleccion(df, seleccion).sum() == len(elegidas)
+
+def test_ultima_pagina_parcial():
+    df = ordenar_lineas(_lineas())
+    paginas = num_paginas(len(df))
+
+    assert paginas == 3
+    assert len(pagina(df, paginas)) == 7
+    pd.testing.assert_frame_equal(pd.concat([pagina(df, n) for n in range(1, paginas + 1)]), df)
+
+def test_tabla_vacia():
+    df = _lineas(0)
+
+    assert num_paginas(len(df)) == 1
+    assert len(pagina(ordenar_lineas(df), 1)) == 0
+    assert mascara_seleccion(df, {('PC-0000', 'ART-0')}).tolist() == []
+    assert marcar(set(), df) == set()
+
+def test_desmarcar_en_otra_pagina():
+    df = ordenar_lineas(_lineas())
+    seleccion = marcar(set(), df)
+    segunda = pagina(df, 2)
+
+    # Desmarcar la primera línea de la página 2 no toca las de las demás páginas
+    marcadas = np.ones(len(segunda), dtype=bool)
+    marcadas[0] = False
+    _editar(seleccion, segunda, marcadas)
+
+    quitada = tuple(segunda.iloc[0][['Nº documento', 'Nº Artículo']])
+    assert quitada not in seleccion
+    assert len(seleccion) == len(df) - 1
+    assert mascara_seleccion(pagina(df, 1), seleccion).all()
+    assert mascara_seleccion(pagina(df, 3), seleccion).all()